@@ -54,14 +54,76 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 25,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'MovieSeries.renderers.ORJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ],
 }
 
+# Home page snapshot (movie.home)
+HOME_SNAPSHOT_TIMEOUT = 60 * 60  # upper bound on staleness if a change is missed
+HOME_SNAPSHOT_REBUILD_DELAY = 5  # seconds to coalesce bursts of admin edits
+
+# Related titles index (movie.related)
+RELATED_INDEX_SIZE = 24  # neighbors stored per title
+RELATED_PATCH_DELAY = 5  # seconds to coalesce taxonomy edits of one title
+
+# Id pools of the random home and country rails (movie.sampling)
+SAMPLING_POOL_TIMEOUT = 60 * 60 * 24  # pools are also replaced on every title or country change
+SAMPLING_POOL_RECHECK_INTERVAL = 30  # seconds a worker trusts its pools before rechecking the version key
+
+# Buffered watch history writes (movie.watch_buffer)
+WATCH_HISTORY_FLUSH_DELAY = 5  # seconds events wait in the buffer before a flush
+WATCH_HISTORY_FLUSH_BATCH = 1000  # events popped and upserted per bulk_create
+WATCH_HISTORY_LOCAL_BUFFER_SIZE = 100  # per-process fallback buffer size when Redis is unavailable
+
+# Watch history archival (movie archive_watch_history command)
+WATCH_HISTORY_ARCHIVE_AFTER_DAYS = 365  # rows watched longer ago move to WatchHistoryArchive
+WATCH_HISTORY_ARCHIVE_BATCH = 5000  # rows moved per transaction
+
+# Seconds a worker trusts its in-memory SiteSetting before rechecking the version key
+SITE_SETTING_RECHECK_INTERVAL = 30
+
+# Typeahead index behind /main/suggest/ (movie.typeahead), held by every worker
+SUGGEST_INDEX_MEMORY_BUDGET = 16 * 1024 * 1024  # bytes
+SUGGEST_INDEX_RECHECK_INTERVAL = 30  # seconds between checks for changes made by other workers
+SUGGEST_INDEX_CHANGE_LOG_TIMEOUT = 60 * 60 * 24  # seconds changes stay in the log; idler workers rebuild
+SUGGEST_INDEX_MAX_CHANGES = 1000  # changes a worker replays before a rebuild is cheaper
+
+# Per-season series payloads (movie.series_detail)
+SERIES_SEASON_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Cached week view behind /main/weeklist/ (movie.schedule); also replaced on every schedule or series change
+WEEKLY_SCHEDULE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Serialized list rows (movie.fragments); entries also go stale with their title's version
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Cache-Control max-age (seconds) of conditional responses (movie.conditional);
+# clients and nginx revalidate with the ETag afterwards
+CATALOG_MAX_AGE = 60
+WEEKLY_SCHEDULE_MAX_AGE = 5 * 60
+
+# Most ids one /main/movie/batch/, /main/series/batch/ or bulk favorites request may ask for
+BATCH_MAX_IDS = 200
+
+# Per-user favorite id sets (authentication.favorites); dropped on every favorite change
+FAVORITE_IDS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Title snapshots copied into Favorite rows (authentication.favorites)
+FAVORITE_SNAPSHOT_DELAY = 5  # seconds to coalesce edits of one title
+FAVORITE_SNAPSHOT_BATCH = 500  # favorites updated per bulk_update
+
+# Users resolved by CachedJWTAuthentication (authentication.authentication); dropped on every User save
+JWT_USER_CACHE_TIMEOUT = 5 * 60
+JWT_USER_LOCAL_TTL = 5  # seconds a worker trusts its own copy; bounds staleness after a change elsewhere
+JWT_USER_LOCAL_CACHE_SIZE = 10000  # users kept per worker
+
+# ?total=approx on keyset paginated lists (movie.pagination); Postgres uses the planner estimate instead
+APPROXIMATE_COUNT_TIMEOUT = 5 * 60
+
 # JWT settings
 from datetime import timedelta
 SIMPLE_JWT = {
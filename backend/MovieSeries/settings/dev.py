@@ -13,6 +13,13 @@ DATABASES = {
     }
 }
 
+# Per-process cache, so the dev server runs without Redis
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 BASE_URL = "http://127.0.0.1:8000"
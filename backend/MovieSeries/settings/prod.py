@@ -1,5 +1,7 @@
 from .common import *
 import os
+from importlib.util import find_spec
+
 import environ
 
 env = environ.Env()
@@ -20,6 +22,11 @@ SECRET_KEY = env("SECRET_KEY")
 
 ALLOWED_HOSTS = env.list("ALLOWED_HOSTS", default=[])
 
+# No browsable API in production; MessagePack when msgpack is installed.
+REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ['MovieSeries.renderers.ORJSONRenderer']
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('MovieSeries.renderers.MessagePackRenderer')
+
 CSRF_TRUSTED_ORIGINS = [
     'https://api.dramoir.com',
     'https://www.api.dramoir.com',
@@ -38,6 +45,21 @@ DATABASES = {
     }
 }
 
+# Cache settings; shared by every worker, so cached snapshots and version keys agree
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env("REDIS_URL", default="redis://localhost:6379/1"),
+    }
+}
+
+# Celery settings
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://localhost:6379/0")
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TIMEZONE = TIME_ZONE
+
 SECURE_HSTS_SECONDS = 31536000  # 1 year
 SECURE_SSL_REDIRECT = True
 SESSION_COOKIE_SECURE = True
@@ -0,0 +1,104 @@
+"""
+JWT authentication without a user query per request.
+
+CachedJWTAuthentication resolves the token's user from a per-process
+copy kept for JWT_USER_LOCAL_TTL seconds, then from the shared cache
+(JWT_USER_CACHE_TIMEOUT), and only then from the database. Saving or
+deleting a User (profile edits, password changes, the is_verified flip)
+drops both copies via authentication.signals; other workers may serve
+their local copy for up to JWT_USER_LOCAL_TTL seconds more.
+
+Neither copy holds the password hash: the cached fields are every column
+but the password, plus the MD5 digest of the hash that simplejwt's
+revoke check compares tokens against. Users are rebuilt with the password
+deferred, so code that does read it gets it from the database.
+"""
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Per-process users, least recently used first: {user_id: (fields, password digest, cached_at)}
+_users = {'entries': OrderedDict(), 'lock': threading.Lock()}
+
+
+def user_key(user_id):
+    return f'authentication:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(user_key(user_id))
+    with _users['lock']:
+        _users['entries'].pop(str(user_id), None)
+
+
+def cached_fields(User):
+    return [field.attname for field in User._meta.concrete_fields if field.name != 'password']
+
+
+def load_user(user_id):
+    """
+    The User with ``user_id`` and the digest of its password, or
+    (None, None), from the local copy, the shared cache or the database.
+    """
+    User = get_user_model()
+    entries = _users['entries']
+    with _users['lock']:
+        entry = entries.get(str(user_id))
+        if entry is not None and monotonic() - entry[2] < settings.JWT_USER_LOCAL_TTL:
+            entries.move_to_end(str(user_id))
+        else:
+            entry = None
+
+    if entry is None:
+        cached = cache.get(user_key(user_id))
+        if cached is None:
+            row = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}) \
+                .values(*cached_fields(User), 'password').first()
+            if row is None:
+                return None, None
+            cached = (row, get_md5_hash_password(row.pop('password')))
+            cache.set(user_key(user_id), cached, settings.JWT_USER_CACHE_TIMEOUT)
+        entry = (*cached, monotonic())
+        with _users['lock']:
+            entries[str(user_id)] = entry
+            entries.move_to_end(str(user_id))
+            while len(entries) > settings.JWT_USER_LOCAL_CACHE_SIZE:
+                entries.popitem(last=False)
+
+    # Each request gets its own instance; views may modify request.user.
+    fields, password_digest, _ = entry
+    user = User.from_db(User.objects.db, list(fields), list(fields.values()))
+    return user, password_digest
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication with the user looked up through load_user()."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user, password_digest = load_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM) != password_digest:
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed")
+
+        return user
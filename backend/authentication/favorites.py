@@ -0,0 +1,148 @@
+"""
+Favorites in bulk, the per-user favorite id set and the title snapshots.
+
+favorite_ids() keeps {content_type: ids} of one user in the cache, so
+the "is it a favorite" state of a whole page of titles is one cache
+read. Every write to a user's favorites (add_favorites, remove_favorites,
+FavoriteSerializer.create, FavoriteDeleteView) drops the set when its
+transaction commits and the next read reloads it with one query.
+
+Favorite rows carry a copy of their title's name, poster, overview and
+rate so favorites lists need no join. movie.signals queues
+refresh_favorite_snapshots (authentication.tasks) when one of those
+changes; the reconcile_favorite_snapshots command repairs any drift.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from movie.models import Movie, Series
+
+from .models import Favorite
+
+CONTENT_MODELS = {'movie': Movie, 'series': Series}
+SNAPSHOT_FIELDS = ['title', 'poster_path', 'overview', 'vote_average']
+# Title fields the snapshot is copied from
+SNAPSHOT_SOURCE_FIELDS = ['title', 'image', 'description', 'rate']
+
+
+def favorite_ids_key(user_id):
+    return f'authentication:favorite-ids:{user_id}'
+
+
+def favorite_ids(user_id):
+    """{'movie': set of ids, 'series': set of ids} favorited by the user."""
+    ids = cache.get(favorite_ids_key(user_id))
+    if ids is None:
+        ids = {content_type: [] for content_type in CONTENT_MODELS}
+        for content_type, content_id in Favorite.objects.filter(user_id=user_id) \
+                .order_by().values_list('content_type', 'content_id'):
+            ids[content_type].append(content_id)
+        cache.set(favorite_ids_key(user_id), ids, settings.FAVORITE_IDS_CACHE_TIMEOUT)
+    return {content_type: set(content_ids) for content_type, content_ids in ids.items()}
+
+
+def invalidate_favorite_ids(user_id):
+    transaction.on_commit(lambda: cache.delete(favorite_ids_key(user_id)))
+
+
+def content_snapshot(content):
+    """The Favorite fields copied from a Movie or Series."""
+    return {
+        'title': content.title,
+        'poster_path': content.image.url if content.image else None,
+        'overview': content.description,
+        'vote_average': float(content.rate) if content.rate else 0,
+    }
+
+
+def add_favorites(user, items):
+    """
+    Favorite every (content_type, content_id) of ``items`` that exists,
+    with one query per content type and one INSERT. Returns the items
+    added and the items whose title does not exist.
+    """
+    existing = favorite_ids(user.pk)
+    added, missing, favorites = [], [], []
+    for content_type, model in CONTENT_MODELS.items():
+        ids = {content_id for kind, content_id in items if kind == content_type}
+        titles = model.objects.only(*SNAPSHOT_SOURCE_FIELDS).in_bulk(ids)
+        for content_id in ids:
+            if content_id not in titles:
+                missing.append((content_type, content_id))
+            elif content_id not in existing[content_type]:
+                added.append((content_type, content_id))
+                favorites.append(Favorite(user=user, content_type=content_type, content_id=content_id,
+                                          **content_snapshot(titles[content_id])))
+    if favorites:
+        with transaction.atomic():
+            Favorite.objects.bulk_create(favorites, ignore_conflicts=True)
+            invalidate_favorite_ids(user.pk)
+    return added, missing
+
+
+def remove_favorites(user, items):
+    """Unfavorite every (content_type, content_id) of ``items``; returns the rows deleted."""
+    deleted = 0
+    with transaction.atomic():
+        for content_type in CONTENT_MODELS:
+            ids = {content_id for kind, content_id in items if kind == content_type}
+            if ids:
+                deleted += Favorite.objects.filter(
+                    user=user, content_type=content_type, content_id__in=ids).delete()[0]
+        if deleted:
+            invalidate_favorite_ids(user.pk)
+    return deleted
+
+
+def snapshot_pending_key(content_type, content_id):
+    return f'authentication:favorite-snapshot:pending:{content_type}:{content_id}'
+
+
+def schedule_snapshot_refresh(content_type, content_id):
+    """Queue a snapshot refresh for one title; repeated changes within the delay collapse."""
+    from movie.tasks import queue_once
+
+    from .tasks import refresh_favorite_snapshots
+
+    # No broker: reconcile_favorite_snapshots catches up later.
+    queue_once(snapshot_pending_key(content_type, content_id), refresh_favorite_snapshots,
+               (content_type, content_id), countdown=settings.FAVORITE_SNAPSHOT_DELAY)
+
+
+def refresh_snapshots(content_type, content_ids=None, dry_run=False):
+    """
+    Copy the current snapshot of ``content_ids`` (every title when None)
+    into their favorites. Favorites are read in pk order and the stale ones
+    written FAVORITE_SNAPSHOT_BATCH rows per bulk_update, so no statement
+    locks more than one batch. Returns the number of stale favorites,
+    left as they are with ``dry_run``.
+    """
+    model = CONTENT_MODELS[content_type]
+    favorites = Favorite.objects.filter(content_type=content_type).order_by('pk') \
+        .only('content_id', *SNAPSHOT_FIELDS)
+    if content_ids is not None:
+        favorites = favorites.filter(content_id__in=content_ids)
+
+    updated, last_pk = 0, 0
+    while True:
+        batch = list(favorites.filter(pk__gt=last_pk)[:settings.FAVORITE_SNAPSHOT_BATCH])
+        if not batch:
+            return updated
+        last_pk = batch[-1].pk
+        titles = model.objects.only(*SNAPSHOT_SOURCE_FIELDS) \
+            .in_bulk({favorite.content_id for favorite in batch})
+        stale = []
+        for favorite in batch:
+            title = titles.get(favorite.content_id)
+            if title is None:
+                continue
+            snapshot = content_snapshot(title)
+            if any(getattr(favorite, field) != value for field, value in snapshot.items()):
+                for field, value in snapshot.items():
+                    setattr(favorite, field, value)
+                stale.append(favorite)
+        if stale and not dry_run:
+            Favorite.objects.bulk_update(stale, SNAPSHOT_FIELDS)
+        updated += len(stale)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from authentication.favorites import CONTENT_MODELS, refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Copy the current title, poster, overview and rate of every title into its favorites'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report the stale favorites')
+
+    def handle(self, *args, **options):
+        for content_type in CONTENT_MODELS:
+            count = refresh_snapshots(content_type, dry_run=options['dry_run'])
+            if options['dry_run']:
+                self.stdout.write(f"{count} {content_type} favorites with a stale snapshot")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Refreshed {count} {content_type} favorites"))
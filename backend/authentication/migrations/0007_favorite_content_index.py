@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_alter_favorite_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['content_type', 'content_id'], name='favorite_content_idx'),
+        ),
+    ]
@@ -129,4 +129,8 @@ class Favorite(models.Model):
     class Meta:
         # Ensure a user can't add the same content twice
         unique_together = ('user', 'content_id', 'content_type')
-        ordering = ['-added_at']  # Latest favorites first 
\ No newline at end of file
+        ordering = ['-added_at']  # Latest favorites first
+        indexes = [
+            # Favorites of one title, refreshed by authentication.favorites.refresh_snapshots
+            models.Index(fields=['content_type', 'content_id'], name='favorite_content_idx'),
+        ]
\ No newline at end of file
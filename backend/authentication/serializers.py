@@ -1,10 +1,12 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from .models import VerificationCode, PasswordResetCode, User, Favorite
 import base64
 from django.core.files.base import ContentFile
 from movie.models import Movie, Series
+from .favorites import content_snapshot, invalidate_favorite_ids
 
 User = get_user_model()
 
@@ -140,28 +142,26 @@ class FavoriteSerializer(serializers.ModelSerializer):
             return existing
         
         # Get content data based on type
-        if content_type == 'movie':
-            content = Movie.objects.get(id=content_id)
-            title = content.title
-            poster_path = content.image.url if content.image else None
-            overview = content.description
-            vote_average = float(content.rate) if content.rate else 0
-        else:
-            content = Series.objects.get(id=content_id)
-            title = content.title
-            poster_path = content.image.url if content.image else None
-            overview = content.description
-            vote_average = float(content.rate) if content.rate else 0
-        
+        content = (Movie if content_type == 'movie' else Series).objects.get(id=content_id)
+
         # Create favorite with content data
         favorite = Favorite.objects.create(
             user=user,
             content_id=content_id,
             content_type=content_type,
-            title=title,
-            poster_path=poster_path,
-            overview=overview,
-            vote_average=vote_average
+            **content_snapshot(content)
         )
+        invalidate_favorite_ids(user.pk)
         
-        return favorite 
\ No newline at end of file
+        return favorite
+
+class FavoriteItemSerializer(serializers.Serializer):
+    content_id = serializers.IntegerField(min_value=1)
+    content_type = serializers.ChoiceField(choices=Favorite.CONTENT_TYPES)
+
+class FavoriteItemsSerializer(serializers.Serializer):
+    items = serializers.ListField(child=FavoriteItemSerializer(), allow_empty=False,
+                                  max_length=settings.BATCH_MAX_IDS)
+
+    def validate_items(self, items):
+        return list(dict.fromkeys((item['content_type'], item['content_id']) for item in items))
@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+
+
+# Users cached by CachedJWTAuthentication (authentication.authentication)
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_id = instance.pk
+    # Now for this worker, and again once the new row is visible to the others.
+    invalidate_user(user_id)
+    transaction.on_commit(lambda: invalidate_user(user_id))
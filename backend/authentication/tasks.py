@@ -57,4 +57,18 @@ def send_password_reset_email(self, email, reset_code):
         return f"Password reset email sent to {email}"
     except Exception as exc:
         logger.error(f"Failed to send password reset email to {email}: {str(exc)}")
-        raise self.retry(exc=exc, countdown=60) 
\ No newline at end of file
+        raise self.retry(exc=exc, countdown=60)
+
+
+@shared_task
+def refresh_favorite_snapshots(content_type, content_id):
+    """
+    Copy the current title, poster, overview and rate of one movie or
+    series into its favorites.
+    """
+    from django.core.cache import cache
+    from .favorites import refresh_snapshots, snapshot_pending_key
+
+    cache.delete(snapshot_pending_key(content_type, content_id))
+    count = refresh_snapshots(content_type, [content_id])
+    logger.info(f"Refreshed {count} favorite snapshots of {content_type} {content_id}")
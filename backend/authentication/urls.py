@@ -9,6 +9,8 @@ from .views import (
     UserProfileView,
     FavoriteListCreateView,
     FavoriteDeleteView,
+    FavoriteBulkView,
+    FavoriteMembershipView,
 )
 
 urlpatterns = [
@@ -20,5 +22,7 @@ urlpatterns = [
     path('password-reset-confirm/', PasswordResetConfirmView.as_view(), name='password-reset-confirm'),
     path('profile/', UserProfileView.as_view(), name='user-profile'),
     path('favorites/', FavoriteListCreateView.as_view(), name='favorite-list-create'),
+    path('favorites/bulk/', FavoriteBulkView.as_view(), name='favorite-bulk'),
+    path('favorites/membership/', FavoriteMembershipView.as_view(), name='favorite-membership'),
     path('favorites/<int:content_id>/', FavoriteDeleteView.as_view(), name='favorite-delete'),
 ] 
\ No newline at end of file
@@ -15,8 +15,10 @@ from .serializers import (
     PasswordResetRequestSerializer,
     PasswordResetConfirmSerializer,
     UserProfileSerializer,
-    FavoriteSerializer
+    FavoriteSerializer,
+    FavoriteItemsSerializer
 )
+from .favorites import add_favorites, favorite_ids, invalidate_favorite_ids, remove_favorites
 import random
 import string
 from datetime import timedelta
@@ -348,6 +350,10 @@ class FavoriteDeleteView(generics.DestroyAPIView):
             content_type=content_type
         )
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        invalidate_favorite_ids(instance.user_id)
+
     def destroy(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
@@ -357,4 +363,113 @@ class FavoriteDeleteView(generics.DestroyAPIView):
             return Response(
                 {"detail": "This content is not in your favorites."},
                 status=status.HTTP_404_NOT_FOUND
-            ) 
\ No newline at end of file
+            )
+
+
+def favorite_items(items):
+    return [{'content_type': content_type, 'content_id': content_id} for content_type, content_id in items]
+
+class FavoriteBulkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="""افزودن چند فیلم یا سریال به علاقه‌مندی‌ها به صورت یکجا
+        هدرهای مورد نیاز:
+        Authorization: Bearer {توکن_دسترسی}
+        Content-Type: application/json""",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['items'],
+            properties={
+                'items': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        required=['content_id', 'content_type'],
+                        properties={
+                            'content_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='شناسه فیلم یا سریال'),
+                            'content_type': openapi.Schema(type=openapi.TYPE_STRING, description='نوع محتوا', enum=['movie', 'series'])
+                        }
+                    )
+                )
+            }
+        ),
+        responses={201: openapi.Response('محتواهای افزوده‌شده و محتواهایی که وجود ندارند')}
+    )
+    def post(self, request):
+        serializer = FavoriteItemsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        added, missing = add_favorites(request.user, serializer.validated_data['items'])
+        return Response({'added': favorite_items(added), 'missing': favorite_items(missing)},
+                        status=status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(
+        operation_description="""حذف چند فیلم یا سریال از علاقه‌مندی‌ها به صورت یکجا
+        هدرهای مورد نیاز:
+        Authorization: Bearer {توکن_دسترسی}
+        Content-Type: application/json""",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['items'],
+            properties={
+                'items': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        required=['content_id', 'content_type'],
+                        properties={
+                            'content_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='شناسه فیلم یا سریال'),
+                            'content_type': openapi.Schema(type=openapi.TYPE_STRING, description='نوع محتوا', enum=['movie', 'series'])
+                        }
+                    )
+                )
+            }
+        ),
+        responses={200: openapi.Response('تعداد محتواهای حذف‌شده')}
+    )
+    def delete(self, request):
+        serializer = FavoriteItemsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        removed = remove_favorites(request.user, serializer.validated_data['items'])
+        return Response({'removed': removed})
+
+class FavoriteMembershipView(APIView):
+    """
+    Which of ``?movie=1,2,3`` and ``?series=4,5`` are the user's
+    favorites, from the cached favorite id set. Without either parameter
+    every favorite id is returned.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def requested_ids(self, content_type):
+        ids = set()
+        for value in self.request.query_params.get(content_type, '').split(','):
+            value = value.strip()
+            if not value:
+                continue
+            if not value.isdigit():
+                raise ValidationError({content_type: f'"{value}" is not a valid id.'})
+            ids.add(int(value))
+        return ids
+
+    @swagger_auto_schema(
+        operation_description="""بررسی اینکه کدام فیلم‌ها و سریال‌ها در علاقه‌مندی‌های کاربر هستند
+        هدرهای مورد نیاز:
+        Authorization: Bearer {توکن_دسترسی}""",
+        manual_parameters=[
+            openapi.Parameter('movie', openapi.IN_QUERY, description='شناسه فیلم‌ها، جدا شده با کاما',
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('series', openapi.IN_QUERY, description='شناسه سریال‌ها، جدا شده با کاما',
+                              type=openapi.TYPE_STRING),
+        ],
+        responses={200: openapi.Response('شناسه‌هایی که در علاقه‌مندی‌ها هستند')}
+    )
+    def get(self, request):
+        favorites = favorite_ids(request.user.pk)
+        requested = {content_type: self.requested_ids(content_type) for content_type in favorites}
+        if sum(len(ids) for ids in requested.values()) > settings.BATCH_MAX_IDS:
+            raise ValidationError({'detail': f'At most {settings.BATCH_MAX_IDS} ids per request.'})
+        if any(requested.values()):
+            favorites = {content_type: favorites[content_type] & ids
+                         for content_type, ids in requested.items()}
+        return Response({content_type: sorted(ids) for content_type, ids in favorites.items()})
@@ -0,0 +1,7 @@
+# Loaded automatically by gunicorn from the working directory.
+
+
+def post_worker_init(worker):
+    # Build the /main/suggest/ index before the worker takes traffic.
+    from movie.typeahead import index
+    index.build()
@@ -67,7 +67,7 @@ class MovieAdmin(admin.ModelAdmin):
 @admin.register(Series)
 class SeriesAdmin(admin.ModelAdmin):
     list_display = ('title', 'release_year', 'rate',
-                    'average_rating', 'choosen_home_page', 'trend', 'related_countires')
+                    'average_rating', 'season_count', 'episode_count', 'choosen_home_page', 'trend', 'related_countires')
     list_editable = ('choosen_home_page', 'trend')
     search_fields = ('title',)
     list_filter = ('choosen_home_page', 'trend', 'countries', 'languages', 'genres', 'release_year')
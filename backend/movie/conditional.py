@@ -0,0 +1,117 @@
+"""
+Validators and cache policy for conditional GETs.
+
+Movie and series details are versioned per title and the catalog lists by
+one catalog-wide token. Both tokens live in the shared cache and are
+replaced by movie.signals on every change, so ETags are computed without
+touching the database and a matching If-None-Match is answered with a 304
+before anything is loaded or serialized. The weekly schedule is validated
+from the version of its cached structure. The home page has no validator:
+three of its rails are drawn anew per request, so it is marked private
+and never answered with a 304 or shared by nginx.
+"""
+from hashlib import md5
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .models import Season
+from .utilities import SITE_SETTING_VERSION_KEY
+
+CATALOG_VERSION_KEY = 'movie:catalog:version'
+
+
+def token(key):
+    return cache.get_or_set(key, uuid4().hex, None)
+
+
+def make_etag(request, *parts):
+    # The browsable API and JSON share URLs, so the representation is part of the tag.
+    parts = (*parts, getattr(request, 'accepted_media_type', ''))
+    return md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def site_version():
+    # Download links embed the site's download domain.
+    return token(SITE_SETTING_VERSION_KEY)
+
+
+def title_version_key(kind, pk):
+    return f'movie:{kind}:{pk}:version'
+
+
+def title_version(kind, pk):
+    return token(title_version_key(kind, pk))
+
+
+def invalidate_titles(titles):
+    """Replace the version of every ``(kind, pk)`` title and of the catalog."""
+    versions = {title_version_key(kind, pk): uuid4().hex for kind, pk in titles if pk}
+    versions[CATALOG_VERSION_KEY] = uuid4().hex
+    cache.set_many(versions, None)
+
+
+def titles_for(instance):
+    """(kind, pk) of the titles whose payloads show ``instance``, before and after a move."""
+    model = instance._meta.label
+    if model == 'movie.Movie':
+        return {('movie', instance.pk)}
+    if model == 'movie.Series':
+        return {('series', instance.pk)}
+    if model == 'review.Comment':
+        return {('movie', instance.movie_id), ('series', instance.series_id)}
+    if model == 'movie.Season':
+        return {('series', instance.series_id),
+                ('series', getattr(instance, '_previous_series_id', None))}
+
+    titles, season_ids = set(), set()
+    if model == 'movie.Episode':
+        season_ids = {instance.season_id, getattr(instance, '_previous_season_id', None)}
+    elif model == 'movie.DownloadFile':
+        previous_movie_id, previous_episode_id = \
+            getattr(instance, '_previous_owner', None) or (None, None)
+        titles = {('movie', instance.movie_id), ('movie', previous_movie_id),
+                  ('series', getattr(instance, '_series_id', None))}
+        episode_ids = {instance.episode_id, previous_episode_id} - {None}
+        if episode_ids:
+            season_ids = Season.objects.filter(
+                episodes__in=episode_ids).values_list('pk', flat=True)
+    season_ids = set(season_ids) - {None}
+    if season_ids:
+        titles |= {('series', pk) for pk in Season.objects.filter(
+            pk__in=season_ids).values_list('series_id', flat=True)}
+    return titles
+
+
+def catalog_etag(request, *args, **kwargs):
+    return make_etag(request, token(CATALOG_VERSION_KEY), site_version(), request.get_full_path())
+
+
+def movie_etag(request, pk):
+    # The query string carries ?fields=/?expand=.
+    return make_etag(request, title_version('movie', pk), site_version(), request.get_full_path())
+
+
+def series_etag(request, pk, number=None):
+    """ETag of a series detail (mode and field set are in the path) or of one of its seasons."""
+    return make_etag(request, title_version('series', pk), site_version(), request.get_full_path())
+
+
+def weekly_schedule_etag(request, *args, **kwargs):
+    from .schedule import WEEKLY_SCHEDULE_VERSION_KEY
+
+    return make_etag(request, token(WEEKLY_SCHEDULE_VERSION_KEY), request.get_full_path())
+
+
+def conditional(etag_func=None, last_modified_func=None, max_age=0):
+    """
+    Method decorator for API views: 304 on a matching validator and a
+    public Cache-Control that nginx's proxy_cache can honor.
+    """
+    return method_decorator([
+        cache_control(public=True, max_age=max_age, stale_while_revalidate=max_age),
+        condition(etag_func=etag_func, last_modified_func=last_modified_func),
+    ])
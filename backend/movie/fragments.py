@@ -0,0 +1,74 @@
+"""
+Per-row fragment cache for the list serializers.
+
+A MovieListSerializer/SeriesListSerializer row is cached under (serializer
+class, field set, pk) next to the title version token it was built from (see
+movie.conditional). movie.signals replaces the token on every change to
+the title or its taxonomy, TitleQuerySet.update() on queryset writes such
+as the rating aggregates. A page of rows costs one get_many for both; only rows whose
+fragment is missing or stale get their relations prefetched (those the
+field set reads), are serialized and are written back with one set_many.
+"""
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers
+
+from .conditional import title_version, title_version_key
+from .prefetch import list_prefetches
+
+
+def fragment_variant(serializer):
+    # Image fields render absolute URLs when a request is in the context,
+    # and ?fields=/?expand= narrow the row.
+    request = serializer.context.get('request')
+    base = request.build_absolute_uri('/') if request is not None else ''
+    variant = ':'.join([base, *sorted(serializer.fields)])
+    return md5(variant.encode()).hexdigest()[:8]
+
+
+class FragmentCachedListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        instances = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        by_pk = {obj.pk: obj for obj in instances}
+        return self.rows_for([obj.pk for obj in instances],
+                             lambda pks: {pk: by_pk[pk] for pk in pks})
+
+    def rows_for(self, pks, load):
+        """
+        Rows of the titles ``pks``, in order. ``load(pks)`` returns
+        {pk: instance} and is only called for the fragment misses; titles
+        it does not return are left out.
+        """
+        if not pks:
+            return []
+        kind = self.child.Meta.model.__name__.lower()
+        version_keys = {pk: title_version_key(kind, pk) for pk in pks}
+        prefix = f'movie:fragment:{type(self.child).__name__}'
+        variant = fragment_variant(self.child)
+        fragment_keys = {pk: f'{prefix}:{pk}:{variant}' for pk in pks}
+        cached = cache.get_many([*version_keys.values(), *fragment_keys.values()])
+
+        rows, misses = {}, {}
+        for pk in pks:
+            version = cached.get(version_keys[pk])
+            fragment = cached.get(fragment_keys[pk])
+            if version is not None and fragment is not None and fragment[0] == version:
+                rows[pk] = fragment[1]
+            else:
+                misses[pk] = version or title_version(kind, pk)
+
+        instances = load(list(misses)) if misses else {}
+        if instances:
+            prefetch_related_objects(list(instances.values()),
+                                     *list_prefetches(self.child.fields))
+            fresh = {}
+            for pk, obj in instances.items():
+                rows[pk] = self.child.to_representation(obj)
+                fresh[fragment_keys[pk]] = (misses[pk], rows[pk])
+            cache.set_many(fresh, settings.FRAGMENT_CACHE_TIMEOUT)
+
+        return [rows[pk] for pk in pks if pk in rows]
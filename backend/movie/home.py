@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Movie, Series
+from .prefetch import movies_for_list, series_for_list
+from .sampling import sample_ids
+from .serializers import MovieListSerializer, SeriesListSerializer
+
+HOME_SNAPSHOT_KEY = 'movie:home:snapshot'
+HOME_REBUILD_PENDING_KEY = 'movie:home:rebuild-pending'
+
+HOME_RAILS = ('trend_movies', 'trend_series', 'choosen_korean_movie', 'choosen_movie',
+              'choosen_korean_series', 'best_korean_series', 'best_chineas_series', 'best_series')
+
+# Rails drawn anew on every request (movie.sampling): rail name -> items
+# drawn and the titles they are drawn from.
+RANDOM_RAILS = {
+    'choosen_korean_movie': (8, lambda: Movie.objects.filter(
+        choosen_home_page=True, countries__name__in=["South Korea"])),
+    'choosen_movie': (8, lambda: Movie.objects.filter(choosen_home_page=True).exclude(
+        countries__name__in=["South Korea"])),
+    'choosen_korean_series': (6, lambda: Series.objects.filter(
+        choosen_home_page=True, countries__name__in=['South Korea'])),
+}
+
+
+def build_home_snapshot():
+    """
+    Serialize the fixed home page rails and store the result in the
+    shared cache. The random rails are drawn per request.
+    """
+    trend_movies = movies_for_list().filter(trend=True)
+    trend_series = series_for_list().filter(trend=True)
+
+    best_korean_series = series_for_list().filter(
+        choosen_home_page=False,
+        countries__name__in=['South Korea']).order_by('-rate')[:6]
+    best_chineas_series = series_for_list().filter(
+        choosen_home_page=False,
+        countries__name__in=['China']).order_by('-rate')[:6]
+    best_series = series_for_list().filter(choosen_home_page=False).exclude(
+        countries__name__in=['South Korea', 'China']).order_by('-rate')[:6]
+
+    snapshot = {
+        'trend_movies': MovieListSerializer(trend_movies, many=True).data,
+        'trend_series': SeriesListSerializer(trend_series, many=True).data,
+        'best_korean_series': SeriesListSerializer(best_korean_series, many=True).data,
+        'best_chineas_series': SeriesListSerializer(best_chineas_series, many=True).data,
+        'best_series': SeriesListSerializer(best_series, many=True).data
+    }
+    snapshot = {rail: list(rows) for rail, rows in snapshot.items()}
+
+    cache.set(HOME_SNAPSHOT_KEY, snapshot, settings.HOME_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def get_home_snapshot():
+    snapshot = cache.get(HOME_SNAPSHOT_KEY)
+    if snapshot is None:
+        snapshot = build_home_snapshot()
+    return snapshot
+
+
+def random_rail(rail):
+    """Rows of titles drawn from the rail's pool; only those rows are loaded."""
+    size, candidates = RANDOM_RAILS[rail]
+    queryset = candidates()
+    pks = sample_ids(f'home:{rail}', queryset, size)
+    if queryset.model is Movie:
+        serializer, titles = MovieListSerializer(many=True), movies_for_list()
+    else:
+        serializer, titles = SeriesListSerializer(many=True), series_for_list()
+    return serializer.rows_for(pks, titles.in_bulk)
+
+
+def render_home_page(snapshot):
+    """The cached rails with this request's random rails drawn in."""
+    return {rail: random_rail(rail) if rail in RANDOM_RAILS else snapshot[rail]
+            for rail in HOME_RAILS}
+
+
+def schedule_home_rebuild():
+    """
+    Queue a background rebuild of the snapshot. Bursts of changes collapse
+    into a single task; the stale snapshot keeps being served meanwhile.
+    """
+    from .tasks import queue_once, rebuild_home_snapshot
+
+    # No broker: the snapshot is dropped so the next request rebuilds it inline.
+    queue_once(HOME_REBUILD_PENDING_KEY, rebuild_home_snapshot,
+               countdown=settings.HOME_SNAPSHOT_REBUILD_DELAY,
+               timeout=settings.HOME_SNAPSHOT_TIMEOUT, stale_keys=[HOME_SNAPSHOT_KEY])
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from movie.models import WatchHistory, WatchHistoryArchive
+from movie.watch_stats import rebuild_stats
+
+ARCHIVED_FIELDS = ['pk', 'user_id', 'content_id', 'content_type', 'country_id', 'watched_at']
+
+
+class Command(BaseCommand):
+    help = 'Move watch history older than the archive horizon into WatchHistoryArchive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.WATCH_HISTORY_ARCHIVE_AFTER_DAYS,
+                            help='Archive rows watched more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=settings.WATCH_HISTORY_ARCHIVE_BATCH,
+                            help='Rows moved per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days and --batch-size must be positive')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = WatchHistory.objects.filter(watched_at__lt=cutoff).order_by('pk')
+
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} rows watched before {cutoff:%Y-%m-%d}")
+            return
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                rows = list(expired.select_for_update()
+                            .values_list(*ARCHIVED_FIELDS)[:options['batch_size']])
+                if not rows:
+                    break
+                WatchHistoryArchive.objects.bulk_create([
+                    WatchHistoryArchive(user_id=user_id, content_id=content_id,
+                                        content_type=content_type, country_id=country_id,
+                                        watched_at=watched_at)
+                    for _, user_id, content_id, content_type, country_id, watched_at in rows
+                ])
+                # A plain DELETE: per-row post_delete signals would update the
+                # stats one row at a time, the rebuild below does it per batch.
+                quote = connection.ops.quote_name
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"DELETE FROM {quote(WatchHistory._meta.db_table)} "
+                        f"WHERE {quote(WatchHistory._meta.pk.column)} IN ({', '.join(['%s'] * len(rows))})",
+                        [row[0] for row in rows])
+                # UserWatchStats covers the history the API serves.
+                rebuild_stats({row[1] for row in rows})
+            total += len(rows)
+            self.stdout.write(f"Archived {total} rows")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total} rows watched before {cutoff:%Y-%m-%d}"))
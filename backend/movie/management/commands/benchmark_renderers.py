@@ -0,0 +1,52 @@
+from timeit import Timer
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+
+from MovieSeries.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from movie.home import get_home_snapshot, render_home_page
+from movie.prefetch import series_for_detail
+from movie.serializers import SeriesDetailSerializer
+
+
+class Command(BaseCommand):
+    help = 'Time the API renderers on the home and series detail payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--series', type=int,
+                            help='Series to render (default: the one with the most episodes)')
+        parser.add_argument('--number', type=int, default=200,
+                            help='Renders per measurement')
+
+    def handle(self, *args, **options):
+        series = series_for_detail()
+        if options['series']:
+            series = series.filter(pk=options['series'])
+        else:
+            series = series.annotate(episode_total=Count('seasons__episodes')) \
+                .order_by('-episode_total')
+        series = series.first()
+        if series is None:
+            raise CommandError('No series to render')
+
+        payloads = {
+            'home': render_home_page(get_home_snapshot()),
+            f'series {series.pk}': SeriesDetailSerializer(series).data,
+        }
+        renderers = [JSONRenderer(), ORJSONRenderer()]
+        if msgpack is not None:
+            renderers.append(MessagePackRenderer())
+
+        for name, data in payloads.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            baseline = None
+            for renderer in renderers:
+                body = renderer.render(data, renderer.media_type, {})
+                timer = Timer(lambda: renderer.render(data, renderer.media_type, {}))
+                # Best of five: the least disturbed run.
+                seconds = min(timer.repeat(repeat=5, number=options['number'])) / options['number']
+                baseline = baseline or seconds
+                self.stdout.write(
+                    f"  {type(renderer).__name__:<22}{seconds * 1e6:>10.1f} us"
+                    f"{len(body):>10} bytes{baseline / seconds:>8.1f}x")
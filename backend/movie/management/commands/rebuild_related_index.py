@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from movie.models import Movie, Series
+from movie.related import rebuild_related_index
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related titles index of every movie and series'
+
+    def handle(self, *args, **options):
+        for model in (Movie, Series):
+            count = rebuild_related_index(model)
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt related index for {count} {model._meta.verbose_name_plural}"))
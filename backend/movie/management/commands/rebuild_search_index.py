@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from movie.models import SearchDocument
+from movie.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of movies and series'
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {SearchDocument.objects.count()} titles"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from movie.models import Movie, Series
+
+
+class Command(BaseCommand):
+    help = 'Repoint Movie and Series best_download after bulk DownloadFile changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report the drifted titles')
+
+    def handle(self, *args, **options):
+        for model in (Movie, Series):
+            drifted_ids = list(model.objects.with_actual_best_download().filter(
+                ~Q(best_download_rank=F('actual_best_download_rank')) |
+                Q(best_download__isnull=True, actual_best_download__isnull=False) |
+                Q(best_download__isnull=False, actual_best_download__isnull=True)
+            ).values_list('pk', flat=True))
+
+            name = model._meta.verbose_name_plural
+            self.stdout.write(f"{len(drifted_ids)} {name} with a drifted best download")
+            if options['dry_run'] or not drifted_ids:
+                continue
+
+            updated = model.objects.filter(pk__in=drifted_ids).refresh_best_download()
+            self.stdout.write(self.style.SUCCESS(f"Repointed {updated} {name}"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from movie.models import Movie, Series
+
+
+class Command(BaseCommand):
+    help = 'Fix drifted rating/comment aggregates on Movie and Series'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report the drifted titles')
+
+    def handle(self, *args, **options):
+        for model in (Movie, Series):
+            drifted_ids = list(model.objects.with_actual_ratings().filter(
+                ~Q(rating_sum=F('actual_rating_sum')) |
+                ~Q(rating_count=F('actual_rating_count')) |
+                ~Q(comment_count=F('actual_comment_count'))
+            ).values_list('pk', flat=True))
+
+            name = model._meta.verbose_name_plural
+            self.stdout.write(f"{len(drifted_ids)} {name} with drifted ratings")
+            if options['dry_run'] or not drifted_ids:
+                continue
+
+            updated = model.objects.filter(pk__in=drifted_ids).refresh_ratings()
+            self.stdout.write(self.style.SUCCESS(f"Recomputed {updated} {name}"))
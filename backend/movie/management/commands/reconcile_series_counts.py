@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from movie.models import Series
+
+
+class Command(BaseCommand):
+    help = 'Fix drifted Series.season_count / Series.episode_count values'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report the drifted series')
+
+    def handle(self, *args, **options):
+        drifted = Series.objects.with_actual_counts().filter(
+            ~Q(season_count=F('actual_season_count')) |
+            ~Q(episode_count=F('actual_episode_count'))
+        ).values_list('pk', flat=True)
+        drifted_ids = list(drifted)
+
+        self.stdout.write(f"{len(drifted_ids)} series with drifted counts")
+        if options['dry_run'] or not drifted_ids:
+            return
+
+        updated = Series.objects.filter(pk__in=drifted_ids).refresh_counts()
+        self.stdout.write(self.style.SUCCESS(f"Recounted {updated} series"))
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_series_counts(apps, schema_editor):
+    Series = apps.get_model('movie', 'Series')
+    Season = apps.get_model('movie', 'Season')
+    Episode = apps.get_model('movie', 'Episode')
+
+    seasons = Season.objects.filter(series=OuterRef('pk')).order_by()\
+        .values('series').annotate(total=Count('pk')).values('total')
+    episodes = Episode.objects.filter(season__series=OuterRef('pk')).order_by()\
+        .values('season__series').annotate(total=Count('pk')).values('total')
+    Series.objects.update(
+        season_count=Coalesce(Subquery(seasons), 0),
+        episode_count=Coalesce(Subquery(episodes), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0002_watchhistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='series',
+            name='episode_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='series',
+            name='season_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_series_counts, migrations.RunPython.noop),
+    ]
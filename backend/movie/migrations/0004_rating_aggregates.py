@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    Comment = apps.get_model('review', 'Comment')
+
+    for model_name, field in (('Movie', 'movie'), ('Series', 'series')):
+        accepted = Comment.objects.filter(
+            **{field: OuterRef('pk')}, accepted=True
+        ).order_by().values(field)
+        apps.get_model('movie', model_name).objects.update(
+            rating_sum=Coalesce(Subquery(
+                accepted.annotate(total=Sum('rating')).values('total')), 0),
+            rating_count=Coalesce(Subquery(
+                accepted.annotate(total=Count('rating')).values('total')), 0),
+            comment_count=Coalesce(Subquery(
+                accepted.annotate(total=Count('pk')).values('total')), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0003_series_counts'),
+        ('review', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='series',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='series',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='series',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
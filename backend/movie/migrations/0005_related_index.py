@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:18
+
+from django.db import migrations, models
+
+from movie.related import rebuild_related_index
+
+
+def populate_related_index(apps, schema_editor):
+    # rebuild_related_index only reads the m2m tables and writes related_index,
+    # so it works on the historical models.
+    for model_name in ('Movie', 'Series'):
+        rebuild_related_index(apps.get_model('movie', model_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0004_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='related_index',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='series',
+            name='related_index',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(populate_related_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:19
+
+from django.db import migrations, models
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """ALTER TABLE movie_searchdocument ADD COLUMN document tsvector
+       GENERATED ALWAYS AS (
+           setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+           setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+       ) STORED""",
+    "CREATE INDEX movie_searchdocument_document_gin ON movie_searchdocument USING gin (document)",
+    "CREATE INDEX movie_searchdocument_title_trgm ON movie_searchdocument USING gin (title gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS movie_searchdocument_title_trgm",
+    "DROP INDEX IF EXISTS movie_searchdocument_document_gin",
+    "ALTER TABLE movie_searchdocument DROP COLUMN IF EXISTS document",
+]
+
+# External content FTS5 table kept in sync with movie_searchdocument by triggers.
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE movie_searchdocument_fts USING fts5(
+           title, body,
+           content='movie_searchdocument', content_rowid='id',
+           tokenize='unicode61 remove_diacritics 2'
+       )""",
+    """CREATE TRIGGER movie_searchdocument_ai AFTER INSERT ON movie_searchdocument BEGIN
+           INSERT INTO movie_searchdocument_fts(rowid, title, body)
+           VALUES (new.id, new.title, new.body);
+       END""",
+    """CREATE TRIGGER movie_searchdocument_ad AFTER DELETE ON movie_searchdocument BEGIN
+           INSERT INTO movie_searchdocument_fts(movie_searchdocument_fts, rowid, title, body)
+           VALUES ('delete', old.id, old.title, old.body);
+       END""",
+    """CREATE TRIGGER movie_searchdocument_au AFTER UPDATE ON movie_searchdocument BEGIN
+           INSERT INTO movie_searchdocument_fts(movie_searchdocument_fts, rowid, title, body)
+           VALUES ('delete', old.id, old.title, old.body);
+           INSERT INTO movie_searchdocument_fts(rowid, title, body)
+           VALUES (new.id, new.title, new.body);
+       END""",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS movie_searchdocument_au",
+    "DROP TRIGGER IF EXISTS movie_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS movie_searchdocument_ai",
+    "DROP TABLE IF EXISTS movie_searchdocument_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def populate_search_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('movie', 'SearchDocument')
+
+    for model_name, content_type in (('Movie', 'movie'), ('Series', 'series')):
+        titles = apps.get_model('movie', model_name).objects.prefetch_related('crews')
+        SearchDocument.objects.bulk_create([
+            SearchDocument(
+                content_type=content_type,
+                object_id=title.pk,
+                title=title.title,
+                body=f"{title.description or ''}\n" + ' '.join(crew.name for crew in title.crews.all()),
+                rate=title.rate
+            )
+            for title in titles
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0005_related_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(choices=[('movie', 'Movie'), ('series', 'Series')], max_length=10)),
+                ('object_id', models.IntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('rate', models.DecimalField(decimal_places=1, max_digits=3)),
+            ],
+            options={
+                'unique_together': {('content_type', 'object_id')},
+            },
+        ),
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:29
+
+import django.db.models.deletion
+import django.db.models.expressions
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_best_download(apps, schema_editor):
+    DownloadFile = apps.get_model('movie', 'DownloadFile')
+
+    for model_name, owner in (('Movie', 'movie'), ('Series', 'episode__season__series')):
+        files = DownloadFile.objects.filter(
+            **{owner: OuterRef('pk')}).order_by('-rank', '-pk')
+        apps.get_model('movie', model_name).objects.update(
+            best_download=Subquery(files.values('pk')[:1]),
+            best_download_rank=Coalesce(Subquery(files.values('rank')[:1]), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0006_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='downloadfile',
+            name='rank',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.Case(models.When(source='CAM', then=10000), models.When(source='TS', then=20000), models.When(source='DVD-Rip', then=30000), models.When(source='HDTV', then=40000), models.When(source='BRRip', then=50000), models.When(source='HDRip', then=60000), models.When(source='WEBRip', then=70000), models.When(source='WEB-DL', then=80000), models.When(source='Blu-ray', then=90000), default=0), '+', models.Case(models.When(quality='144p', then=144), models.When(quality='240p', then=240), models.When(quality='360p', then=360), models.When(quality='480p', then=480), models.When(quality='540p', then=540), models.When(quality='720p', then=720), models.When(quality='1080p', then=1080), models.When(quality='1440p', then=1440), models.When(quality='2160p', then=2160), models.When(quality='4320p', then=4320), default=0)), output_field=models.PositiveIntegerField()),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='best_download',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='movie.downloadfile'),
+        ),
+        migrations.AddField(
+            model_name='series',
+            name='best_download',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='movie.downloadfile'),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='best_download_rank',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='series',
+            name='best_download_rank',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='downloadfile',
+            index=models.Index(fields=['movie', '-rank'], name='downloadfile_movie_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='downloadfile',
+            index=models.Index(fields=['episode', '-rank'], name='downloadfile_episode_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-best_download_rank', '-id'], name='movie_best_download_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='series',
+            index=models.Index(fields=['-best_download_rank', '-id'], name='series_best_download_rank_idx'),
+        ),
+        migrations.RunPython(populate_best_download, migrations.RunPython.noop),
+    ]
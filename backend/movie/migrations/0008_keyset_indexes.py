@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:33
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0007_best_download'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-rate', '-id'], name='movie_rate_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-created_at', '-id'], name='movie_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(models.OrderBy(django.db.models.functions.comparison.Coalesce('release_year', 0), descending=True), models.OrderBy(models.F('id'), descending=True), name='movie_year_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='series',
+            index=models.Index(fields=['-rate', '-id'], name='series_rate_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='series',
+            index=models.Index(fields=['-created_at', '-id'], name='series_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='series',
+            index=models.Index(models.OrderBy(django.db.models.functions.comparison.Coalesce('release_year', 0), descending=True), models.OrderBy(models.F('id'), descending=True), name='series_year_id_idx'),
+        ),
+    ]
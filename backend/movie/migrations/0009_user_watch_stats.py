@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_alter_favorite_unique_together'),
+        ('movie', '0008_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserWatchStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='watch_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_movies', models.PositiveIntegerField(default=0)),
+                ('total_series', models.PositiveIntegerField(default=0)),
+                ('movies_by_country', models.JSONField(default=dict)),
+                ('series_by_country', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
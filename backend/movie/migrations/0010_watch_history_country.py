@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    First of three: the data copy (0011) and the schema changes that
+    follow it (0012) run in their own transactions, as Postgres refuses to
+    ALTER a table with pending deferred FK checks from the same one.
+    """
+
+    dependencies = [
+        ('movie', '0009_user_watch_stats'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='watchhistory',
+            old_name='country',
+            new_name='country_name',
+        ),
+        migrations.AlterField(
+            model_name='watchhistory',
+            name='country_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='watchhistory',
+            name='country',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='movie.country'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:12
+
+from django.db import migrations
+
+
+def link_countries(apps, schema_editor):
+    """Point every row at the Country named by its old string, one UPDATE per name."""
+    Country = apps.get_model('movie', 'Country')
+    WatchHistory = apps.get_model('movie', 'WatchHistory')
+    names = WatchHistory.objects.exclude(country_name='').order_by() \
+        .values_list('country_name', flat=True).distinct()
+    countries = dict(Country.objects.filter(name__in=list(names)).values_list('name', 'pk'))
+    for name, country_id in countries.items():
+        WatchHistory.objects.filter(country_name=name).update(country_id=country_id)
+
+
+def unlink_countries(apps, schema_editor):
+    Country = apps.get_model('movie', 'Country')
+    WatchHistory = apps.get_model('movie', 'WatchHistory')
+    country_ids = WatchHistory.objects.exclude(country=None).order_by() \
+        .values_list('country_id', flat=True).distinct()
+    for country_id, name in Country.objects.filter(pk__in=list(country_ids)).values_list('pk', 'name'):
+        WatchHistory.objects.filter(country_id=country_id).update(country_name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0010_watch_history_country'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_countries, unlink_countries),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_alter_favorite_unique_together'),
+        ('movie', '0011_link_watch_history_countries'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='watchhistory',
+            name='country_name',
+        ),
+        migrations.AddIndex(
+            model_name='watchhistory',
+            index=models.Index(fields=['user', '-watched_at', '-id'], name='watchhistory_user_recent_idx'),
+        ),
+        migrations.CreateModel(
+            name='WatchHistoryArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_id', models.IntegerField()),
+                ('content_type', models.CharField(choices=[('movie', 'Movie'), ('series', 'Series')], max_length=10)),
+                ('watched_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('country', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='movie.country')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0012_watch_history_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='watchhistory',
+            name='watched_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 
 class SiteSetting(models.Model):
@@ -74,6 +77,110 @@ class Crew(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+    """
+    update() sends no signals: bump the versions of the updated titles
+    (movie.conditional) and rebuild the home snapshot once the
+    transaction commits, so ETags, cached list rows (movie.fragments) and
+    the home rails follow queryset writes such as the aggregate helpers.
+    Writes to a field copied into Favorite rows also queue their snapshot
+    refresh (authentication.favorites).
+    """
+
+    def update(self, **kwargs):
+        kind = self.model.__name__.lower()
+        pks = set(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        if pks:
+            from authentication.favorites import SNAPSHOT_SOURCE_FIELDS, schedule_snapshot_refresh
+
+            from .conditional import invalidate_titles
+            from .home import schedule_home_rebuild
+
+            transaction.on_commit(lambda: invalidate_titles([(kind, pk) for pk in pks]))
+            transaction.on_commit(schedule_home_rebuild)
+            if not kwargs.keys().isdisjoint(SNAPSHOT_SOURCE_FIELDS):
+                def refresh_snapshots():
+                    for pk in pks:
+                        schedule_snapshot_refresh(kind, pk)
+
+                transaction.on_commit(refresh_snapshots)
+        return rows
+
+
+class RatedQuerySet(TitleQuerySet):
+    """
+    Titles carrying aggregates over their accepted comments, kept up to
+    date by review.signals and the Comment queryset.
+    """
+
+    def shift_ratings(self, rating=0, ratings=0, comments=0):
+        """Apply a delta to the stored comment aggregates."""
+        return self.update(
+            rating_sum=F('rating_sum') + rating,
+            rating_count=F('rating_count') + ratings,
+            comment_count=F('comment_count') + comments
+        )
+
+    def _actual_ratings(self):
+        relation = self.model._meta.get_field('comments')
+        accepted = relation.related_model.objects.filter(
+            **{relation.field.name: OuterRef('pk')}, accepted=True
+        ).order_by().values(relation.field.name)
+        return {
+            'rating_sum': Coalesce(Subquery(accepted.annotate(
+                total=Sum('rating')).values('total')), 0),
+            'rating_count': Coalesce(Subquery(accepted.annotate(
+                total=Count('rating')).values('total')), 0),
+            'comment_count': Coalesce(Subquery(accepted.annotate(
+                total=Count('pk')).values('total')), 0),
+        }
+
+    def with_actual_ratings(self):
+        return self.annotate(**{
+            f'actual_{name}': expression
+            for name, expression in self._actual_ratings().items()
+        })
+
+    def refresh_ratings(self):
+        """Recompute the comment aggregates from scratch in a single UPDATE."""
+        return self.update(**self._actual_ratings())
+
+
+class BestDownloadQuerySet(TitleQuerySet):
+    """
+    Titles pointing at their best download file (highest DownloadFile.rank),
+    kept up to date by movie.signals.
+    """
+    # DownloadFile lookup leading from a file to its title
+    download_owner = None
+
+    def _best_files(self):
+        return DownloadFile.objects.filter(
+            **{self.download_owner: OuterRef('pk')}).order_by('-rank', '-pk')
+
+    def _actual_best_download(self):
+        files = self._best_files()
+        return {
+            'best_download': Subquery(files.values('pk')[:1]),
+            'best_download_rank': Coalesce(Subquery(files.values('rank')[:1]), 0),
+        }
+
+    def with_actual_best_download(self):
+        return self.annotate(**{
+            f'actual_{name}': expression
+            for name, expression in self._actual_best_download().items()
+        })
+
+    def refresh_best_download(self):
+        """Repoint every title at its best download file in a single UPDATE."""
+        return self.update(**self._actual_best_download())
+
+
+class MovieQuerySet(BestDownloadQuerySet, RatedQuerySet):
+    download_owner = 'movie'
+
+
 class Movie(models.Model):
     AGE_CATEGORY_CHOICES = (
         ('G', 'General Audiences(G)'),
@@ -136,18 +243,42 @@ class Movie(models.Model):
     )
     choosen_home_page = models.BooleanField(default=False)
     trend = models.BooleanField(default=False)
+    # Aggregates over accepted comments, see RatedQuerySet
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # [[pk, score], ...] best first, maintained by movie.related
+    related_index = models.JSONField(default=list, editable=False)
+    # Best file by DownloadFile.rank, see BestDownloadQuerySet
+    best_download = models.ForeignKey(
+        'DownloadFile',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        editable=False
+    )
+    best_download_rank = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = MovieQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination orderings, see movie.pagination
+            models.Index(fields=['-rate', '-id'], name='movie_rate_id_idx'),
+            models.Index(fields=['-created_at', '-id'], name='movie_created_at_id_idx'),
+            models.Index(Coalesce('release_year', 0).desc(), F('id').desc(), name='movie_year_id_idx'),
+            models.Index(fields=['-best_download_rank', '-id'], name='movie_best_download_rank_idx'),
+        ]
+
     @property
     def average_rating(self):
-        ratings = self.comments.exclude(
-            rating=None).values_list('rating', flat=True)
-        return sum(ratings) / len(ratings) if ratings else None
+        return self.rating_sum / self.rating_count if self.rating_count else None
 
     @property
     def comments_count(self):
-        return self.comments.count()
+        return self.comment_count
 
 
     def save(self, *args, **kwargs):
@@ -168,6 +299,38 @@ class Movie(models.Model):
         return f'{self.title} {self.release_year}'
 
 
+class SeriesQuerySet(BestDownloadQuerySet, RatedQuerySet):
+    download_owner = 'episode__season__series'
+
+    def shift_counts(self, seasons=0, episodes=0):
+        """Apply a season/episode delta to the stored counters."""
+        return self.update(
+            season_count=F('season_count') + seasons,
+            episode_count=F('episode_count') + episodes
+        )
+
+    @staticmethod
+    def _actual_counts():
+        seasons = Season.objects.filter(series=OuterRef('pk')).order_by()\
+            .values('series').annotate(total=Count('pk')).values('total')
+        episodes = Episode.objects.filter(season__series=OuterRef('pk')).order_by()\
+            .values('season__series').annotate(total=Count('pk')).values('total')
+        return {
+            'season_count': Coalesce(Subquery(seasons), 0),
+            'episode_count': Coalesce(Subquery(episodes), 0),
+        }
+
+    def with_actual_counts(self):
+        return self.annotate(**{
+            f'actual_{name}': expression
+            for name, expression in self._actual_counts().items()
+        })
+
+    def refresh_counts(self):
+        """Recount seasons and episodes from scratch in a single UPDATE."""
+        return self.update(**self._actual_counts())
+
+
 class Series(models.Model):
     AGE_CATEGORY_CHOICES = (
         ('G', 'General Audiences'),
@@ -223,18 +386,45 @@ class Series(models.Model):
 
     choosen_home_page = models.BooleanField(default=False)
     trend = models.BooleanField(default=False)
+    # Maintained by movie.signals and the Season/Episode querysets
+    season_count = models.PositiveIntegerField(default=0, editable=False)
+    episode_count = models.PositiveIntegerField(default=0, editable=False)
+    # Aggregates over accepted comments, see RatedQuerySet
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # [[pk, score], ...] best first, maintained by movie.related
+    related_index = models.JSONField(default=list, editable=False)
+    # Best episode file by DownloadFile.rank, see BestDownloadQuerySet
+    best_download = models.ForeignKey(
+        'DownloadFile',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        editable=False
+    )
+    best_download_rank = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SeriesQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination orderings, see movie.pagination
+            models.Index(fields=['-rate', '-id'], name='series_rate_id_idx'),
+            models.Index(fields=['-created_at', '-id'], name='series_created_at_id_idx'),
+            models.Index(Coalesce('release_year', 0).desc(), F('id').desc(), name='series_year_id_idx'),
+            models.Index(fields=['-best_download_rank', '-id'], name='series_best_download_rank_idx'),
+        ]
+
     @property
     def average_rating(self):
-        ratings = self.comments.exclude(
-            rating=None).values_list('rating', flat=True)
-        return sum(ratings) / len(ratings) if ratings else None
+        return self.rating_sum / self.rating_count if self.rating_count else None
 
     @property
     def comments_count(self):
-        return self.comments.count()
+        return self.comment_count
 
     def save(self, *args, **kwargs):
         if self.trend:
@@ -254,6 +444,61 @@ class Series(models.Model):
     def __str__(self):
         return self.title
 
+class CountedQuerySet(models.QuerySet):
+    """
+    Bulk operations skip model signals, so recount the affected series
+    after them instead.
+    """
+    series_lookup = None
+    parent_fields = ()
+
+    def _series_ids(self, pks):
+        return set(
+            self.model._base_manager.filter(pk__in=pks)
+            .values_list(self.series_lookup, flat=True)
+        )
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        pks = [obj.pk for obj in objs if obj.pk is not None]
+        if len(pks) == len(objs):
+            Series.objects.filter(pk__in=self._series_ids(pks)).refresh_counts()
+        else:
+            # The backend did not return primary keys; fall back to a full recount.
+            Series.objects.refresh_counts()
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if not set(fields) & set(self.parent_fields):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        pks = [obj.pk for obj in objs]
+        affected = self._series_ids(pks)
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        affected |= self._series_ids(pks)
+        Series.objects.filter(pk__in=affected).refresh_counts()
+        return rows
+
+    def update(self, **kwargs):
+        if not set(kwargs) & set(self.parent_fields):
+            return super().update(**kwargs)
+        pks = list(self.values_list('pk', flat=True))
+        affected = self._series_ids(pks)
+        rows = super().update(**kwargs)
+        affected |= self._series_ids(pks)
+        Series.objects.filter(pk__in=affected).refresh_counts()
+        return rows
+
+
+class SeasonQuerySet(CountedQuerySet):
+    series_lookup = 'series_id'
+    parent_fields = ('series', 'series_id')
+
+
+class EpisodeQuerySet(CountedQuerySet):
+    series_lookup = 'season__series_id'
+    parent_fields = ('season', 'season_id')
+
+
 class Season(models.Model):
     title = models.CharField(
         max_length=255,
@@ -284,6 +529,8 @@ class Season(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SeasonQuerySet.as_manager()
+
     def avg_duration(self):
         episode_durations = self.episodes.exclude(
             duration=None).values_list('duration', flat=True)
@@ -321,6 +568,8 @@ class Episode(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EpisodeQuerySet.as_manager()
+
     def __str__(self):
         season = str(self.season.number).zfill(3)
         episode = str(self.number).zfill(3)
@@ -412,9 +661,34 @@ class DownloadFile(models.Model):
         null=True,
         blank=True
     )
+    # Source first (SOURCE_CHOICES are listed best first), then resolution:
+    # a Blu-ray 1080p is 91080, a WEB-DL 2160p 82160.
+    rank = models.GeneratedField(
+        expression=Case(
+            *[When(source=source, then=position * 10000)
+              for position, (source, _) in enumerate(reversed(SOURCE_CHOICES), start=1)],
+            default=0
+        ) + Case(
+            *[When(quality=quality, then=int(quality[:-1]))
+              for quality in QualityChoices.values],
+            default=0
+        ),
+        output_field=models.PositiveIntegerField(),
+        db_persist=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['movie', '-rank'], name='downloadfile_movie_rank_idx'),
+            models.Index(fields=['episode', '-rank'], name='downloadfile_episode_rank_idx'),
+        ]
+
+    @property
+    def label(self):
+        return f'{self.source} {self.quality}'
+
     def __str__(self):
         context = f"Movie: {self.movie.title}"\
             if self.movie\
@@ -525,12 +799,89 @@ class WatchHistory(models.Model):
     user = models.ForeignKey('authentication.User', on_delete=models.CASCADE, related_name='watch_history')
     content_id = models.IntegerField()  # ID of the movie or series
     content_type = models.CharField(max_length=10, choices=CONTENT_TYPE_CHOICES)
-    country = models.CharField(max_length=100)  # Country of the content
-    watched_at = models.DateTimeField(auto_now_add=True)
+    # First country of the content
+    country = models.ForeignKey(Country, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='+')
+    # Set by movie.watch_buffer to the time of the latest play event
+    watched_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         unique_together = ['user', 'content_id', 'content_type']
         ordering = ['-watched_at']
+        indexes = [
+            # Keyset pagination of one user's history (movie.pagination.WatchHistoryPagination)
+            models.Index(fields=['user', '-watched_at', '-id'], name='watchhistory_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} watched {self.content_type} {self.content_id}"
+
+
+class WatchHistoryArchive(models.Model):
+    """
+    WatchHistory rows older than WATCH_HISTORY_ARCHIVE_AFTER_DAYS, moved
+    here by the archive_watch_history command. Append-only and not read
+    by the API.
+    """
+    user = models.ForeignKey('authentication.User', on_delete=models.CASCADE, related_name='+')
+    content_id = models.IntegerField()
+    content_type = models.CharField(max_length=10, choices=WatchHistory.CONTENT_TYPE_CHOICES)
+    country = models.ForeignKey(Country, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='+')
+    watched_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+
+class UserWatchStats(models.Model):
+    """
+    Per-user totals of WatchHistory, kept in step by movie.watch_stats:
+    incrementally as rows are added, moved to another country or removed,
+    and in bulk by the rebuild_watch_stats task.
+    """
+    user = models.OneToOneField('authentication.User', on_delete=models.CASCADE,
+                                primary_key=True, related_name='watch_stats')
+    total_movies = models.PositiveIntegerField(default=0)
+    total_series = models.PositiveIntegerField(default=0)
+    # {country: count}
+    movies_by_country = models.JSONField(default=dict)
+    series_by_country = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def add(self, content_type, country, count):
+        """Count ``count`` (possibly negative) more rows of one content type and country."""
+        if content_type == WatchHistory.MOVIE:
+            self.total_movies += count
+            by_country = self.movies_by_country
+        else:
+            self.total_series += count
+            by_country = self.series_by_country
+        by_country[country] = by_country.get(country, 0) + count
+        if by_country[country] <= 0:
+            del by_country[country]
+
+
+class SearchDocument(models.Model):
+    """
+    Denormalized text of a movie or series for full-text search. The
+    backend specific index (tsvector column + GIN indexes on Postgres,
+    FTS5 table on SQLite) is created by migration 0006 and read by
+    movie.search.
+    """
+    MOVIE = 'movie'
+    SERIES = 'series'
+    CONTENT_TYPE_CHOICES = [
+        (MOVIE, 'Movie'),
+        (SERIES, 'Series'),
+    ]
+
+    content_type = models.CharField(max_length=10, choices=CONTENT_TYPE_CHOICES)
+    object_id = models.IntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)  # description and crew names
+    rate = models.DecimalField(max_digits=3, decimal_places=1)
+
+    class Meta:
+        unique_together = ['content_type', 'object_id']
+
+    def __str__(self):
+        return f"{self.content_type} {self.object_id}: {self.title}"
@@ -0,0 +1,189 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Row count of ``queryset`` for display: the planner's estimate on
+    Postgres, elsewhere an exact count cached for APPROXIMATE_COUNT_TIMEOUT.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    key = 'movie:count:' + md5(str(queryset.order_by().query).encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, settings.APPROXIMATE_COUNT_TIMEOUT)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek pagination over a fixed ordering that ends with a unique column,
+    e.g. (-rate, -id). The opaque cursor holds the last row's sort key and
+    the next page is ``WHERE (rate, id) < (cursor) ... LIMIT n``, so with a
+    matching index page 1000 costs the same as page 1 and there is no
+    COUNT(*). ``?total=approx`` adds an estimated ``total``.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    total_query_param = 'total'
+    invalid_cursor_message = 'Invalid cursor'
+    # Every field must be non-null; the last one unique.
+    ordering = ('-rate', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param],
+                                 strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        queryset = queryset.order_by(*self.ordering)
+
+        self.total = None
+        if request.query_params.get(self.total_query_param) == 'approx':
+            self.total = estimate_count(queryset)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.seek(position))
+            except (DjangoValidationError, TypeError, ValueError):
+                # Well-formed cursor holding values the ordering fields reject
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:self.page_size + 1])
+        self.page = rows[:self.page_size]
+        self.next_position = self.position_of(self.page[-1]) \
+            if len(rows) > self.page_size else None
+        return self.page
+
+    def seek(self, position):
+        """Rows strictly after ``position`` in ``self.ordering``."""
+        fields = [(order.lstrip('-'), order.startswith('-')) for order in self.ordering]
+        after = Q()
+        for depth, (field, descending) in enumerate(fields):
+            equal = {name: value for (name, _), value in zip(fields[:depth], position)}
+            after |= Q(**equal, **{f'{field}__{"lt" if descending else "gt"}': position[depth]})
+        # Redundant bound on the leading column so the index scan starts at the cursor.
+        field, descending = fields[0]
+        return Q(**{f'{field}__{"lte" if descending else "gte"}': position[0]}) & after
+
+    def position_of(self, instance):
+        return [str(getattr(instance, order.lstrip('-'))) for order in self.ordering]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            remove_query_param(self.base_url, self.total_query_param),
+            self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.total is not None:
+            response['total'] = self.total
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'total': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+
+class NewestFirstPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class WatchHistoryPagination(KeysetPagination):
+    """One user's watch history, most recently watched first."""
+    ordering = ('-watched_at', '-id')
+
+
+class TitleCursorPagination(KeysetPagination):
+    """
+    Keyset pagination over movies or series, sorted by ``?sort=``
+    (rate, year, newest or quality).
+    """
+    sort_query_param = 'sort'
+    default_sort = 'rate'
+    orderings = {
+        'rate': ('-rate', '-id'),
+        # release_year is nullable on Movie; undated titles sort last.
+        'year': ('-sort_year', '-id'),
+        'newest': ('-created_at', '-id'),
+        'quality': ('-best_download_rank', '-id'),
+    }
+
+    def get_sort(self, request):
+        sort = request.query_params.get(self.sort_query_param)
+        return sort if sort in self.orderings else self.default_sort
+
+    def get_ordering(self, request, queryset, view):
+        return self.orderings[self.get_sort(request)]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.get_sort(request) == 'year':
+            queryset = queryset.annotate(sort_year=Coalesce('release_year', 0))
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_first_page(self, queryset, request, url, view=None):
+        """
+        Paginate from the start, ignoring any cursor on ``request``, with
+        the page links pointing at ``url`` instead of the current path.
+        """
+        self.first_page = True
+        page = self.paginate_queryset(queryset, request, view)
+        self.base_url = request.build_absolute_uri(url)
+        for param in (self.sort_query_param, self.page_size_query_param):
+            if param in request.query_params:
+                self.base_url = replace_query_param(
+                    self.base_url, param, request.query_params[param])
+        return page
+
+    def decode_cursor(self, request):
+        if getattr(self, 'first_page', False):
+            return None
+        return super().decode_cursor(request)
@@ -0,0 +1,76 @@
+from django.db.models import Avg, Count, Prefetch
+
+from .models import Crew, Movie, Season, Series
+
+TAXONOMY_FIELDS = ('countries', 'languages', 'genres')
+CREW_FIELDS = ('director', 'directors', 'actors', 'writers', 'other_stars')
+
+
+def crew_prefetch():
+    """All crews of a title in one query; serializers bucket them by role."""
+    return Prefetch('crews', queryset=Crew.objects.only('id', 'name', 'role'))
+
+
+def wants(fields, *names):
+    """Whether serializer ``fields`` (None for all) include any of ``names``."""
+    return fields is None or any(name in fields for name in names)
+
+
+def list_prefetches(fields=None):
+    """Everything the list serializers read from a title, narrowed to ``fields``."""
+    lookups = ['best_download'] if wants(fields, 'highest_quality') else []
+    lookups += [field for field in TAXONOMY_FIELDS if wants(fields, field)]
+    if wants(fields, *CREW_FIELDS):
+        lookups.append(crew_prefetch())
+    return lookups
+
+
+def with_list_relations(queryset, fields=None):
+    return queryset.prefetch_related(*list_prefetches(fields))
+
+
+def movies_for_list(fields=None):
+    """
+    Movies for MovieListSerializer(many=True). Relations are left to
+    movie.fragments, which prefetches them for cache misses only.
+    """
+    queryset = Movie.objects.all()
+    if wants(fields, 'highest_quality'):
+        queryset = queryset.select_related('best_download')
+    return queryset
+
+
+def series_for_list(fields=None):
+    queryset = Series.objects.all()
+    if wants(fields, 'highest_quality'):
+        queryset = queryset.select_related('best_download')
+    return queryset
+
+
+def movies_for_detail(fields=None):
+    queryset = with_list_relations(movies_for_list(fields), fields)
+    if wants(fields, 'download_urls'):
+        queryset = queryset.prefetch_related('download_urls')
+    return queryset
+
+
+def series_for_detail(fields=None):
+    queryset = with_list_relations(series_for_list(fields), fields)
+    if wants(fields, 'seasons'):
+        queryset = queryset.prefetch_related(
+            'seasons', 'seasons__episodes', 'seasons__episodes__download_urls')
+    return queryset
+
+
+def series_for_summary(fields=None):
+    """Series with season headers (episode count and average duration) but no episodes."""
+    queryset = with_list_relations(series_for_list(fields), fields)
+    if not wants(fields, 'seasons'):
+        return queryset
+    return queryset.prefetch_related(Prefetch(
+        'seasons',
+        queryset=Season.objects.annotate(
+            avg_episode_duration=Avg('episodes__duration'),
+            episode_count=Count('episodes')
+        ).order_by('number')
+    ))
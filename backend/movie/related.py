@@ -0,0 +1,178 @@
+"""
+Related titles index.
+
+Each Movie/Series stores its top neighbors in ``related_index`` as
+``[[pk, score], ...]`` (best first). Titles are compared by weighted
+Jaccard similarity of their genres, crews, countries and languages.
+
+Scores are computed through inverted lists (facet value -> titles), the
+sparse form of the title x value incidence matrix times its transpose: a
+title is only ever compared with the titles it shares a value with, and
+the shared-value counts of all of them come from Counter.update over the
+inverted lists, so the work per title is proportional to its candidates,
+not to the catalog. A full rebuild loads each through table once; a
+patch loads only the rows around the changed title.
+"""
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, models
+
+FACET_WEIGHTS = {
+    'genres': 3.0,
+    'crews': 2.0,
+    'countries': 1.5,
+    'languages': 1.0,
+}
+
+
+def facet_rows(model, facet):
+    """The through table rows of ``facet`` and their title and value columns."""
+    field = model._meta.get_field(facet)
+    return (field.remote_field.through.objects.order_by(),
+            f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id')
+
+
+def score_titles(pks, facets):
+    """
+    Yield (pk, {other pk: score}) for every title of ``pks``. ``facets``
+    maps each facet to (values of each title, inverted lists, value counts
+    of every candidate).
+    """
+    for pk in pks:
+        scores = defaultdict(float)
+        for facet, weight in FACET_WEIGHTS.items():
+            values, titles, sizes = facets[facet]
+            own = values.get(pk)
+            if not own:
+                continue
+            shared = Counter()
+            for value in own:
+                shared.update(titles[value])
+            for other, common in shared.items():
+                scores[other] += weight * common / (len(own) + sizes[other] - common)
+        scores.pop(pk, None)
+        yield pk, scores
+
+
+def best(scores):
+    top = heapq.nlargest(settings.RELATED_INDEX_SIZE,
+                         ((round(score, 4), other) for other, score in scores.items()))
+    return [[other, score] for score, other in top]
+
+
+def save_related(model, titles):
+    # A plain QuerySet: TitleQuerySet.update would bump the ETag and fragment
+    # versions of every title and rebuild the home snapshot, and no cached
+    # payload shows related_index. Also works on the historical models.
+    models.QuerySet(model).bulk_update(titles, ['related_index'], batch_size=500)
+
+
+def rebuild_related_index(model):
+    """Recompute the neighbor list of every title of ``model``."""
+    pks = list(model.objects.values_list('pk', flat=True))
+    facets = {}
+    for facet in FACET_WEIGHTS:
+        rows, title_column, value_column = facet_rows(model, facet)
+        values, titles = defaultdict(set), defaultdict(list)
+        for title_id, value_id in rows.values_list(title_column, value_column).iterator():
+            values[title_id].add(value_id)
+            titles[value_id].append(title_id)
+        facets[facet] = (values, titles, {title_id: len(own) for title_id, own in values.items()})
+
+    updated = [model(pk=pk, related_index=best(scores)) for pk, scores in score_titles(pks, facets)]
+    save_related(model, updated)
+    return len(updated)
+
+
+def candidate_scores(model, pks):
+    """
+    {pk: {other pk: score}} for ``pks``, loading only their facet values,
+    the titles sharing one and the value counts of those titles.
+    """
+    facets = {}
+    for facet in FACET_WEIGHTS:
+        rows, title_column, value_column = facet_rows(model, facet)
+        values = defaultdict(set)
+        for title_id, value_id in rows.filter(**{f'{title_column}__in': pks}) \
+                .values_list(title_column, value_column):
+            values[title_id].add(value_id)
+        shared_values = set().union(*values.values())
+        titles = defaultdict(list)
+        for title_id, value_id in rows.filter(**{f'{value_column}__in': shared_values}) \
+                .values_list(title_column, value_column).iterator():
+            titles[value_id].append(title_id)
+        sizes = dict(rows.filter(**{f'{title_column}__in': rows.filter(
+            **{f'{value_column}__in': shared_values}).values(title_column)})
+            .values_list(title_column).annotate(count=models.Count('pk')))
+        facets[facet] = (values, titles, sizes)
+    return dict(score_titles(pks, facets))
+
+
+def listing(model, pk):
+    """{pk: related_index} of the titles whose neighbor list holds ``pk``."""
+    titles = model.objects.exclude(pk=pk)
+    if connection.features.supports_json_field_contains:
+        return dict(titles.filter(related_index__contains=[[pk]]).values_list('pk', 'related_index'))
+    # SQLite and Oracle cannot search inside the JSON.
+    return {other: related for other, related in titles.values_list('pk', 'related_index')
+            if any(entry[0] == pk for entry in related)}
+
+
+def patch_related_index(model, pk):
+    """
+    Refresh one title's neighbors after its taxonomy changed (or it was
+    deleted) and move it in or out of the lists of the titles it shares a
+    facet value with or was listed by. A list the title leaves, or where
+    its score drops, is recomputed from its own candidates so it stays
+    RELATED_INDEX_SIZE long.
+    """
+    scores = candidate_scores(model, [pk]).get(pk, {}) \
+        if model.objects.filter(pk=pk).exists() else None
+    updated = {}
+    if scores is not None:
+        updated[pk] = best(scores)
+        scores = {other: round(score, 4) for other, score in scores.items()}
+    else:
+        scores = {}
+
+    lists = listing(model, pk)
+    # Lists the title may enter: those not full yet or whose last entry it beats.
+    for other, related in model.objects.filter(pk__in=set(scores) - set(lists)) \
+            .values_list('pk', 'related_index'):
+        if len(related) < settings.RELATED_INDEX_SIZE or \
+                (scores[other], pk) > (related[-1][1], related[-1][0]):
+            entries = related + [[pk, scores[other]]]
+            updated[other] = sorted(entries, key=lambda entry: (entry[1], entry[0]),
+                                    reverse=True)[:settings.RELATED_INDEX_SIZE]
+
+    refill = []
+    for other, related in lists.items():
+        previous = next(score for entry_pk, score in related if entry_pk == pk)
+        score = scores.get(other, 0)
+        if score < previous:
+            # Another candidate may now rank above it, or take its place.
+            refill.append(other)
+        elif score != previous:
+            entries = [entry for entry in related if entry[0] != pk] + [[pk, score]]
+            updated[other] = sorted(entries, key=lambda entry: (entry[1], entry[0]), reverse=True)
+    if refill:
+        for other, other_scores in candidate_scores(model, refill).items():
+            updated[other] = best(other_scores)
+
+    save_related(model, [model(pk=other, related_index=related) for other, related in updated.items()])
+    return len(updated)
+
+
+def patch_pending_key(label, pk):
+    return f'movie:related:patch-pending:{label}:{pk}'
+
+
+def schedule_related_patch(model, pk):
+    """Queue a patch for one title; repeated changes within the delay collapse."""
+    from .tasks import patch_related_titles, queue_once
+
+    label = model._meta.label
+    queue_once(patch_pending_key(label, pk), patch_related_titles, (label, pk),
+               countdown=settings.RELATED_PATCH_DELAY)
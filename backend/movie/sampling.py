@@ -0,0 +1,72 @@
+"""
+Id pools behind the randomly drawn rails.
+
+A pool holds the ids of the titles a rail draws from (chosen movies,
+chosen Korean series, the chosen titles of a country, ...) as an
+array('q'): in every worker, and as its bytes in the shared cache. Drawing
+k ids is O(k) and callers then load only those rows. All pools share one
+version token, replaced by movie.signals when a title is saved or deleted
+or its countries change; workers recheck it at most every
+SAMPLING_POOL_RECHECK_INTERVAL seconds.
+"""
+from array import array
+from bisect import bisect_left
+from random import sample
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+POOLS_VERSION_KEY = 'movie:pools:version'
+
+# Per-process copy of the pools drawn from so far, for one version.
+_pools = {'version': None, 'checked_at': None, 'ids': {}}
+
+
+def invalidate_pools():
+    """Make every worker reload its pools on its next recheck."""
+    cache.set(POOLS_VERSION_KEY, uuid4().hex, None)
+    _pools['checked_at'] = None
+
+
+def pools_version():
+    checked_at = _pools['checked_at']
+    if checked_at is None or \
+            monotonic() - checked_at >= settings.SAMPLING_POOL_RECHECK_INTERVAL:
+        version = cache.get_or_set(POOLS_VERSION_KEY, uuid4().hex, None)
+        if version != _pools['version']:
+            _pools['ids'] = {}
+            _pools['version'] = version
+        _pools['checked_at'] = monotonic()
+    return _pools['version']
+
+
+def pool(name, queryset):
+    """Ids of the titles in ``queryset``, cached as the pool ``name``."""
+    version = pools_version()
+    ids = _pools['ids'].get(name)
+    if ids is None:
+        key = f'movie:pool:{name}:{version}'
+        data = cache.get(key)
+        ids = array('q')
+        if data is None:
+            ids.extend(queryset.order_by('pk').values_list('pk', flat=True).distinct())
+            cache.set(key, ids.tobytes(), settings.SAMPLING_POOL_TIMEOUT)
+        else:
+            ids.frombytes(data)
+        _pools['ids'][name] = ids
+    return ids
+
+
+def in_pool(name, queryset, pk):
+    """Whether ``pk`` is in the pool ``name`` of ``queryset``; pools are sorted, so O(log n)."""
+    ids = pool(name, queryset)
+    i = bisect_left(ids, pk)
+    return i < len(ids) and ids[i] == pk
+
+
+def sample_ids(name, queryset, k):
+    """Up to ``k`` random ids from the pool ``name`` of ``queryset``."""
+    ids = pool(name, queryset)
+    return sample(ids, min(len(ids), k))
@@ -0,0 +1,86 @@
+"""
+The weekly schedule as one cached structure.
+
+build_week() loads every active WeeklySchedule with its series in one
+query and groups the rows by weekday, Monday first as in
+WeeklySchedule.DAY_CHOICES. The result is cached under a version token
+that movie.signals replaces whenever a schedule or a series changes, and
+airing() answers "today / next" from it without touching the database.
+"""
+from datetime import datetime, time, timedelta
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .conditional import token
+from .models import WeeklySchedule
+from .serializers import WeeklyScheduleSerializer
+
+WEEKLY_SCHEDULE_VERSION_KEY = 'movie:weekly-schedule:version'
+
+# Indexed like date.weekday()
+WEEKDAYS = [day for day, _ in WeeklySchedule.DAY_CHOICES]
+
+
+def invalidate_weekly_schedule():
+    cache.set(WEEKLY_SCHEDULE_VERSION_KEY, uuid4().hex, None)
+
+
+def build_week(request=None):
+    """{day: {'day_name', 'schedules'}} for the days that have schedules, in weekday order."""
+    schedules = WeeklySchedule.objects.filter(is_active=True).select_related('series') \
+        .order_by(F('air_time').asc(nulls_last=True), 'pk')
+    rows = WeeklyScheduleSerializer(schedules, many=True, context={'request': request}).data
+    week = {day: {'day_name': day_name, 'schedules': []}
+            for day, day_name in WeeklySchedule.DAY_CHOICES}
+    for row in rows:
+        week[row['day_of_week']]['schedules'].append(dict(row))
+    return {day: entry for day, entry in week.items() if entry['schedules']}
+
+
+def get_week(request=None):
+    # Series images are absolute URLs when serialized with a request.
+    base = request.build_absolute_uri('/') if request is not None else ''
+    key = f'movie:weekly-schedule:{token(WEEKLY_SCHEDULE_VERSION_KEY)}:' \
+          f'{md5(base.encode()).hexdigest()[:8]}'
+    week = cache.get(key)
+    if week is None:
+        week = build_week(request)
+        cache.set(key, week, settings.WEEKLY_SCHEDULE_CACHE_TIMEOUT)
+    return week
+
+
+def airing(week, now=None):
+    """
+    Today's schedules and the first one airing at or after ``now``, in
+    the site's time zone (TIME_ZONE, Asia/Tehran). Schedules without an
+    air time are listed for their day but never "next".
+    """
+    now = timezone.localtime(now)
+    today = WEEKDAYS[now.weekday()]
+    next_airing = None
+    # Eight days, so a show earlier today is found again next week.
+    for offset in range(8):
+        date = now.date() + timedelta(days=offset)
+        for row in week.get(WEEKDAYS[date.weekday()], {}).get('schedules', []):
+            if row['air_time'] is None:
+                continue
+            airs_at = datetime.combine(date, time.fromisoformat(row['air_time']), now.tzinfo)
+            if airs_at >= now:
+                next_airing = {**row, 'airs_at': airs_at.isoformat()}
+                break
+        if next_airing is not None:
+            break
+
+    return {
+        'today': {
+            'day_of_week': today,
+            'day_name': dict(WeeklySchedule.DAY_CHOICES)[today],
+            'schedules': week.get(today, {}).get('schedules', []),
+        },
+        'next': next_airing,
+    }
@@ -0,0 +1,180 @@
+import re
+from abc import ABC, abstractmethod
+
+from django.db import connection
+
+from .models import Movie, SearchDocument, Series
+
+FTS_TABLE = 'movie_searchdocument_fts'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def document_for(title):
+    """Build (unsaved) the search document of a Movie or Series."""
+    content_type = SearchDocument.MOVIE if isinstance(title, Movie) else SearchDocument.SERIES
+    crews = ' '.join(crew.name for crew in title.crews.all())
+    return SearchDocument(
+        content_type=content_type,
+        object_id=title.pk,
+        title=title.title,
+        body=f"{title.description or ''}\n{crews}",
+        rate=title.rate
+    )
+
+
+def index_title(title):
+    document = document_for(title)
+    SearchDocument.objects.update_or_create(
+        content_type=document.content_type,
+        object_id=document.object_id,
+        defaults={'title': document.title, 'body': document.body, 'rate': document.rate}
+    )
+
+
+def unindex_title(model, pk):
+    content_type = SearchDocument.MOVIE if model is Movie else SearchDocument.SERIES
+    SearchDocument.objects.filter(content_type=content_type, object_id=pk).delete()
+
+
+def rebuild_index(batch_size=500):
+    SearchDocument.objects.all().delete()
+    for queryset in (Movie.objects.prefetch_related('crews'),
+                     Series.objects.prefetch_related('crews')):
+        documents = [document_for(title) for title in queryset.iterator(chunk_size=batch_size)]
+        SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+    get_search_backend().optimize()
+
+
+class SearchBackend(ABC):
+    """
+    Ranked lookup over SearchDocument. ``search`` returns the
+    (content_type, object_id) pairs of one page, best match first.
+    """
+
+    def __init__(self, query):
+        self.query = query.strip()
+        self.tokens = TOKEN_RE.findall(query.lower())
+
+    @abstractmethod
+    def count(self):
+        """Number of matching documents."""
+
+    @abstractmethod
+    def search(self, offset, limit):
+        """The (content_type, object_id) pairs of the matches in [offset, offset + limit)."""
+
+    @classmethod
+    def optimize(cls):
+        pass
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Prefix tsquery over the weighted ``document`` tsvector (title A,
+    body B), with pg_trgm similarity on the title as a typo fallback.
+    """
+    FROM_WHERE = """
+        FROM movie_searchdocument d
+        WHERE d.document @@ to_tsquery('simple', %s) OR d.title %% %s
+    """
+
+    def _params(self):
+        return [' & '.join(f'{token}:*' for token in self.tokens), ' '.join(self.tokens)]
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) {self.FROM_WHERE}", self._params())
+            return cursor.fetchone()[0]
+
+    def search(self, offset, limit):
+        tsquery, text = self._params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT d.content_type, d.object_id
+                {self.FROM_WHERE}
+                ORDER BY ts_rank(d.document, to_tsquery('simple', %s))
+                         + similarity(d.title, %s) DESC,
+                         d.rate DESC, d.id
+                LIMIT %s OFFSET %s
+            """, [tsquery, text, tsquery, text, limit, offset])
+            return cursor.fetchall()
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 prefix match ranked by bm25 with the title weighted 10x."""
+
+    def _match(self):
+        return ' '.join(f'"{token}"*' for token in self.tokens)
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                [self._match()])
+            return cursor.fetchone()[0]
+
+    def search(self, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT d.content_type, d.object_id
+                FROM {FTS_TABLE} f
+                JOIN movie_searchdocument d ON d.id = f.rowid
+                WHERE {FTS_TABLE} MATCH %s
+                ORDER BY bm25({FTS_TABLE}, 10.0, 1.0), d.rate DESC, d.id
+                LIMIT %s OFFSET %s
+            """, [self._match(), limit, offset])
+            return cursor.fetchall()
+
+    @classmethod
+    def optimize(cls):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+class SubstringSearchBackend(SearchBackend):
+    """
+    Case-insensitive substring match on the title, best rated first: the
+    search the site had before the index, for databases without one.
+    """
+
+    def _matches(self):
+        return SearchDocument.objects.filter(title__icontains=self.query)
+
+    def count(self):
+        return self._matches().count()
+
+    def search(self, offset, limit):
+        return list(self._matches().order_by('-rate', 'id')
+                    .values_list('content_type', 'object_id')[offset:offset + limit])
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend
+    if connection.vendor == 'sqlite':
+        return SQLiteSearchBackend
+    return SubstringSearchBackend
+
+
+class SearchResults:
+    """
+    Lazily paginated, ranked search hits. Supports count() and slicing so
+    it can be handed to a DRF paginator like a queryset.
+    """
+
+    def __init__(self, query):
+        self.backend = get_search_backend()(query)
+
+    def count(self):
+        if not self.backend.tokens:
+            return 0
+        return self.backend.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, page):
+        if not self.backend.tokens:
+            return []
+        return self.backend.search(page.start, page.stop - page.start)
@@ -1,3 +1,5 @@
+from random import sample
+
 from rest_framework import serializers
 from itsdangerous import URLSafeTimedSerializer  # type: ignore
 from django.conf import settings
@@ -5,8 +7,71 @@ from django.conf import settings
 from review.serializers import CommentSerializer
 
 from .models import Country, DownloadFile, Episode, Genre, Language, Movie, Season, Series, WeeklySchedule, ShortDescription, WatchHistory
+from .fragments import FragmentCachedListSerializer
+from .prefetch import movies_for_list, series_for_list
 from .utilities import get_download_domain
 
+
+def crew_names(obj, role):
+    """
+    Names of the title's crew with the given role. All crews are read once
+    (from the prefetch cache when available) and bucketed by role.
+    """
+    by_role = getattr(obj, '_crew_names_by_role', None)
+    if by_role is None:
+        by_role = {}
+        for crew in obj.crews.all():
+            by_role.setdefault(crew.role, []).append(crew.name)
+        obj._crew_names_by_role = by_role
+    return by_role.get(role, [])
+
+
+def best_download_label(obj):
+    """'<source> <quality>' of the title's best download file, or None."""
+    return obj.best_download.label if obj.best_download_id else None
+
+
+def split_param(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(serializer_class, query_params):
+    """
+    Names of the ``serializer_class`` fields asked for by ``?fields=`` and
+    ``?expand=``. ``fields`` picks fields by name; ``expand`` picks the
+    relations (Meta.expandable) and, when given, drops the ones it does not
+    name. With neither every field is returned; ``id`` always is.
+    """
+    meta = serializer_class.Meta
+    expandable = set(getattr(meta, 'expandable', ()))
+    selected = set(meta.fields)
+    if 'fields' in query_params:
+        selected &= split_param(query_params['fields'])
+    if 'expand' in query_params:
+        selected = (selected - expandable) | (set(meta.fields) & expandable
+                                              & split_param(query_params['expand']))
+    return frozenset(selected | {'id'})
+
+
+class SparseFieldsMixin:
+    """
+    Only builds the fields returned by requested_fields(), so a field that
+    is not asked for is never evaluated. The query parameters come from the
+    request in the context, or from ``context['query_params']`` for views
+    that serialize without a request.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        query_params = self.context.get('query_params')
+        if query_params is None and self.context.get('request') is not None:
+            query_params = self.context['request'].query_params
+        if not query_params:
+            return fields
+        selected = requested_fields(type(self), query_params)
+        return {name: field for name, field in fields.items() if name in selected}
+
+
 class CountryNameSerializer(serializers.ModelSerializer):
     class Meta:
         model = Country
@@ -38,7 +103,7 @@ class DownloadFileSerializer(serializers.ModelSerializer):
         return get_download_domain() + obj.download_url
 
 
-class MovieListSerializer(serializers.ModelSerializer):
+class MovieListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     director = serializers.SerializerMethodField()
     highest_quality = serializers.SerializerMethodField()
     countries = CountryNameSerializer(many=True)
@@ -49,19 +114,17 @@ class MovieListSerializer(serializers.ModelSerializer):
         model = Movie
         fields = ['id', 'title', 'release_year', 'countries', 'languages', 'genres', 'highest_quality', 'duration', 'age_category',
                   'imdb_rank', 'rate', 'image', 'description', 'average_rating', 'director']
+        expandable = ['highest_quality', 'countries', 'languages', 'genres', 'director']
+        list_serializer_class = FragmentCachedListSerializer
 
     def get_director(self, obj):
-        return obj.crews.filter(role='D').values_list('name', flat=True)
+        return crew_names(obj, 'D')
 
     def get_highest_quality(self, obj):
-        highest_source = getattr(obj, 'highest_source', None)
-        highest_quality = getattr(obj, 'highest_quality', None)
-        if not highest_quality and not highest_source:
-            return None
-        return f'{highest_source} {highest_quality}'
+        return best_download_label(obj)
 
 
-class MovieDetailSerializer(serializers.ModelSerializer):
+class MovieDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     directors = serializers.SerializerMethodField()
     actors = serializers.SerializerMethodField()
     writers = serializers.SerializerMethodField()
@@ -81,25 +144,27 @@ class MovieDetailSerializer(serializers.ModelSerializer):
                   'countries', 'languages', 'genres', 'directors', 'actors', 'writers',
                   'other_stars', 'age_category', 'description', 'subtitle_link',
                   'trailer_link', 'download_urls', 'related_movies', 'accepted_comments']
+        expandable = ['highest_quality', 'countries', 'languages', 'genres', 'directors', 'actors',
+                      'writers', 'other_stars', 'download_urls', 'related_movies', 'accepted_comments']
 
     def get_trailer_link(self, obj):
         return get_download_domain() + obj.trailer_link
 
 
     def get_highest_quality(self, obj):
-        return f'{obj.highest_source} {obj.highest_quality}'
+        return best_download_label(obj)
 
     def get_directors(self, obj):
-        return obj.crews.filter(role='D').values_list('name', flat=True)
+        return crew_names(obj, 'D')
 
     def get_actors(self, obj):
-        return obj.crews.filter(role='A').values_list('name', flat=True)
+        return crew_names(obj, 'A')
 
     def get_writers(self, obj):
-        return obj.crews.filter(role='W').values_list('name', flat=True)
+        return crew_names(obj, 'W')
 
     def get_other_stars(self, obj):
-        return obj.crews.filter(role='O').values_list('name', flat=True)
+        return crew_names(obj, 'O')
 
     # def get_trailers_urls(self, obj):
     #     return obj.trailers.values_list('url', flat=True)
@@ -109,17 +174,16 @@ class MovieDetailSerializer(serializers.ModelSerializer):
         return CommentSerializer(accepted_comments, many=True).data
 
     def get_related_movies(self, obj):
-        related_movies = Movie.objects.filter(
-            genres__in=obj.genres.all()
-        ).exclude(id=obj.id)
-
-        related_movies = related_movies.order_by('?')[:6]
+        neighbor_ids = [pk for pk, _ in obj.related_index]
+        related_movies = movies_for_list().filter(
+            pk__in=sample(neighbor_ids, min(len(neighbor_ids), 6)))
         return MovieListSerializer(related_movies, many=True).data
 
 
-class SeriesListSerializer(serializers.ModelSerializer):
+class SeriesListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     director = serializers.SerializerMethodField()
-    episodes_number = serializers.SerializerMethodField()
+    episodes_number = serializers.IntegerField(source='episode_count', read_only=True)
+    highest_quality = serializers.SerializerMethodField()
     countries = CountryNameSerializer(many=True)
     languages = LanguageNameSerializer(many=True)
     genres = GenreNameSerializer(many=True)
@@ -127,17 +191,17 @@ class SeriesListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Series
         fields = ['id', 'title', 'release_year', 'end_date', 'age_category', 'description', 'imdb_rank',
-                  'rate', 'image', 'average_rating', 'episodes_number', 'countries', 'languages', 'genres', 'director']
+                  'rate', 'image', 'average_rating', 'episodes_number', 'highest_quality', 'countries',
+                  'languages', 'genres', 'director']
+        expandable = ['highest_quality', 'countries', 'languages', 'genres', 'director']
+        list_serializer_class = FragmentCachedListSerializer
 
     def get_director(self, obj):
-        return obj.crews.filter(role='D').values_list('name', flat=True)
+        return crew_names(obj, 'D')
+
+    def get_highest_quality(self, obj):
+        return best_download_label(obj)
 
-    def get_episodes_number(self, obj):
-        seasons = obj.seasons.all()
-        episodes = 0
-        for season in seasons:
-            episodes += season.episodes.count()
-        return episodes
 
 class EpisodeSerializer(serializers.ModelSerializer):
     download_urls = DownloadFileSerializer(many=True)
@@ -160,8 +224,22 @@ class SeasonSerializer(serializers.ModelSerializer):
         return get_download_domain() + obj.trailer_link
 
 
+class SeasonSummarySerializer(serializers.ModelSerializer):
+    """Season header without episodes; see series_for_summary for the annotations."""
+    trailer_link = serializers.SerializerMethodField()
+    avg_duration = serializers.FloatField(source='avg_episode_duration', read_only=True)
+    episode_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Season
+        fields = ['id', 'title', 'number', 'avg_duration', 'is_finished',
+                  'description', 'trailer_link', 'episode_count']
+
+    def get_trailer_link(self, obj):
+        return get_download_domain() + obj.trailer_link
+
 
-class SeriesDetailSerializer(serializers.ModelSerializer):
+class SeriesDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     director = serializers.SerializerMethodField()
     actors = serializers.SerializerMethodField()
     writers = serializers.SerializerMethodField()
@@ -177,58 +255,53 @@ class SeriesDetailSerializer(serializers.ModelSerializer):
         model = Series
         fields = ['id', 'title', 'release_year', 'end_date', 'age_category', 'description', 'imdb_rank', 'rate',
                   'average_rating', 'image', 'countries', 'languages', 'genres', 'director', 'actors', 'writers', 'other_stars', 'seasons', 'related_series', 'accepted_comments']
+        expandable = ['countries', 'languages', 'genres', 'director', 'actors', 'writers',
+                      'other_stars', 'seasons', 'related_series', 'accepted_comments']
 
     def get_director(self, obj):
-        return obj.crews.filter(role='D').values_list('name', flat=True)
+        return crew_names(obj, 'D')
 
     def get_actors(self, obj):
-        return obj.crews.filter(role='A').values_list('name', flat=True)
+        return crew_names(obj, 'A')
 
     def get_writers(self, obj):
-        return obj.crews.filter(role='W').values_list('name', flat=True)
+        return crew_names(obj, 'W')
 
     def get_other_stars(self, obj):
-        return obj.crews.filter(role='O').values_list('name', flat=True)
+        return crew_names(obj, 'O')
 
     def get_accepted_comments(self, obj):
         accepted_comments = obj.comments.filter(accepted=True)
         return CommentSerializer(accepted_comments, many=True).data
 
     def get_related_series(self, obj):
-        related_series = Series.objects.filter(
-            genres__in=obj.genres.all()
-        ).exclude(id=obj.id)
-
-        related_series = related_series.order_by('?')[:6]
+        neighbor_ids = [pk for pk, _ in obj.related_index]
+        related_series = series_for_list().filter(
+            pk__in=sample(neighbor_ids, min(len(neighbor_ids), 6)))
         return SeriesListSerializer(related_series, many=True).data
 
 
+class SeriesSummarySerializer(SeriesDetailSerializer):
+    seasons = SeasonSummarySerializer(many=True)
+
+
 class CountrySerializer(serializers.ModelSerializer):
     class Meta:
         model = Country
-        fields = ['name', 'movies', 'series']
-
-    movies = MovieListSerializer(many=True)
-    series = SeriesListSerializer(many=True)
+        fields = ['name']
 
 
 class GenreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Genre
-        fields = ['name', 'movies', 'series']
-
-    movies = MovieListSerializer(many=True)
-    series = SeriesListSerializer(many=True)
+        fields = ['name']
 
 
 class LanguageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Language
-        fields = ['name', 'movies', 'series']
-
-    movies = MovieListSerializer(many=True)
-    series = SeriesListSerializer(many=True)
+        fields = ['name']
 
 class WeeklyScheduleSerializer(serializers.ModelSerializer):
     series_title = serializers.CharField(source='series.title', read_only=True)
@@ -250,6 +323,8 @@ class ShortDescriptionSerializer(serializers.ModelSerializer):
 
 
 class WatchHistorySerializer(serializers.ModelSerializer):
+    country = serializers.SlugRelatedField(slug_field='name', read_only=True)
+
     class Meta:
         model = WatchHistory
         fields = ['id', 'content_id', 'content_type', 'country', 'watched_at']
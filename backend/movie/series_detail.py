@@ -0,0 +1,28 @@
+"""
+Per-season series payloads.
+
+Serialized seasons are cached under the series' version token (see
+movie.conditional), so a change to the series makes old entries
+unreachable instead of having to find and delete them.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .conditional import site_version, title_version
+from .models import Season
+from .serializers import SeasonSerializer
+
+
+def season_data(series_id, number):
+    """One season with its episodes and download files, or None if it does not exist."""
+    key = f'movie:series:{series_id}:season:{number}:' \
+          f'{title_version("series", series_id)}:{site_version()}'
+    data = cache.get(key)
+    if data is None:
+        season = Season.objects.filter(series_id=series_id, number=number) \
+            .prefetch_related('episodes__download_urls').order_by('pk').first()
+        if season is None:
+            return None
+        data = dict(SeasonSerializer(season).data)
+        cache.set(key, data, settings.SERIES_SEASON_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,396 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from authentication.favorites import SNAPSHOT_SOURCE_FIELDS, schedule_snapshot_refresh
+
+from .conditional import invalidate_titles, titles_for
+from .home import schedule_home_rebuild
+from .related import schedule_related_patch
+from .sampling import invalidate_pools
+from .schedule import invalidate_weekly_schedule
+from .search import index_title, unindex_title
+from .typeahead import index as typeahead_index
+from .models import Country, Crew, DownloadFile, Episode, Genre, Language, Movie, Season, Series, SiteSetting, WatchHistory, WeeklySchedule
+from .utilities import invalidate_site_setting
+from .watch_stats import record_changes
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(post_save, sender=Series)
+@receiver(post_delete, sender=Series)
+@receiver(post_save, sender=Season)
+@receiver(post_delete, sender=Season)
+@receiver(post_save, sender=Episode)
+@receiver(post_delete, sender=Episode)
+@receiver(post_save, sender=DownloadFile)
+@receiver(post_delete, sender=DownloadFile)
+@receiver(post_save, sender='review.Comment')
+@receiver(post_delete, sender='review.Comment')
+@receiver(m2m_changed, sender=Movie.countries.through)
+@receiver(m2m_changed, sender=Movie.languages.through)
+@receiver(m2m_changed, sender=Movie.genres.through)
+@receiver(m2m_changed, sender=Movie.crews.through)
+@receiver(m2m_changed, sender=Series.countries.through)
+@receiver(m2m_changed, sender=Series.languages.through)
+@receiver(m2m_changed, sender=Series.genres.through)
+@receiver(m2m_changed, sender=Series.crews.through)
+# List rows show taxonomy names and the director
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Crew)
+@receiver(post_delete, sender=Crew)
+def invalidate_home_snapshot(sender, **kwargs):
+    if kwargs.get('action', '').startswith('pre_'):
+        return
+    transaction.on_commit(schedule_home_rebuild)
+
+
+@receiver(m2m_changed, sender=Movie.countries.through)
+@receiver(m2m_changed, sender=Movie.languages.through)
+@receiver(m2m_changed, sender=Movie.genres.through)
+@receiver(m2m_changed, sender=Movie.crews.through)
+@receiver(m2m_changed, sender=Series.countries.through)
+@receiver(m2m_changed, sender=Series.languages.through)
+@receiver(m2m_changed, sender=Series.genres.through)
+@receiver(m2m_changed, sender=Series.crews.through)
+def patch_related_on_taxonomy_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action.startswith('pre_'):
+        return
+    if not reverse:
+        titles = [(type(instance), instance.pk)]
+    else:
+        # Changed from the genre/country/... side: pk_set holds the titles.
+        # A reverse clear does not report them; rebuild_related_index covers it.
+        titles = [(model, pk) for pk in pk_set or ()]
+    for model, pk in titles:
+        transaction.on_commit(lambda model=model, pk=pk: schedule_related_patch(model, pk))
+
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Series)
+def patch_related_on_delete(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: schedule_related_patch(sender, pk))
+
+
+# Search index (movie.search)
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Series)
+def index_saved_title(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_title(instance)
+
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Series)
+def unindex_deleted_title(sender, instance, **kwargs):
+    unindex_title(sender, instance.pk)
+
+
+@receiver(m2m_changed, sender=Movie.crews.through)
+@receiver(m2m_changed, sender=Series.crews.through)
+def reindex_title_crews(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action.startswith('pre_'):
+        return
+    if not reverse:
+        index_title(instance)
+    elif pk_set:
+        for title in model.objects.filter(pk__in=pk_set).prefetch_related('crews'):
+            index_title(title)
+
+
+@receiver(post_save, sender=Crew)
+def reindex_crew_titles(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    for titles in (instance.movies.prefetch_related('crews'),
+                   instance.series.prefetch_related('crews')):
+        for title in titles:
+            index_title(title)
+
+
+# Typeahead index (movie.typeahead)
+
+def typeahead_name_field(sender):
+    return 'name' if sender is Crew else 'title'
+
+
+@receiver(pre_save, sender=Movie)
+@receiver(pre_save, sender=Series)
+@receiver(pre_save, sender=Crew)
+def remember_typeahead_name(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._previous_typeahead_name = sender.objects.filter(
+            pk=instance.pk).values_list(typeahead_name_field(sender), flat=True).first()
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Series)
+@receiver(post_save, sender=Crew)
+def update_typeahead(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    name = getattr(instance, typeahead_name_field(sender))
+    if not created and getattr(instance, '_previous_typeahead_name', None) == name:
+        return
+    kind, pk = sender.__name__.lower(), instance.pk
+    transaction.on_commit(lambda: typeahead_index.update(kind, pk, name))
+
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Series)
+@receiver(post_delete, sender=Crew)
+def remove_from_typeahead(sender, instance, **kwargs):
+    kind, pk = sender.__name__.lower(), instance.pk
+    transaction.on_commit(lambda: typeahead_index.remove(kind, pk))
+
+
+# Catalog and title versions behind the ETags (movie.conditional)
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(post_save, sender=Series)
+@receiver(post_delete, sender=Series)
+@receiver(post_save, sender=Season)
+@receiver(post_delete, sender=Season)
+@receiver(post_save, sender=Episode)
+@receiver(post_delete, sender=Episode)
+@receiver(post_save, sender=DownloadFile)
+@receiver(post_delete, sender=DownloadFile)
+@receiver(post_save, sender='review.Comment')
+@receiver(post_delete, sender='review.Comment')
+def invalidate_title_versions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    titles = titles_for(instance)
+    transaction.on_commit(lambda: invalidate_titles(titles))
+
+
+@receiver(m2m_changed, sender=Movie.countries.through)
+@receiver(m2m_changed, sender=Movie.languages.through)
+@receiver(m2m_changed, sender=Movie.genres.through)
+@receiver(m2m_changed, sender=Movie.crews.through)
+@receiver(m2m_changed, sender=Series.countries.through)
+@receiver(m2m_changed, sender=Series.languages.through)
+@receiver(m2m_changed, sender=Series.genres.through)
+@receiver(m2m_changed, sender=Series.crews.through)
+def invalidate_title_versions_on_taxonomy(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action.startswith('pre_'):
+        return
+    if not reverse:
+        titles = [(type(instance).__name__.lower(), instance.pk)]
+    else:
+        titles = [(model.__name__.lower(), pk) for pk in pk_set or ()]
+    transaction.on_commit(lambda: invalidate_titles(titles))
+
+
+def taxonomy_titles(instance):
+    return [('movie', pk) for pk in instance.movies.values_list('pk', flat=True)] + \
+           [('series', pk) for pk in instance.series.values_list('pk', flat=True)]
+
+
+@receiver(post_save, sender=Crew)
+@receiver(post_save, sender=Country)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Language)
+def invalidate_taxonomy_title_versions(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    titles = taxonomy_titles(instance)
+    transaction.on_commit(lambda: invalidate_titles(titles))
+
+
+@receiver(pre_delete, sender=Crew)
+@receiver(pre_delete, sender=Country)
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Language)
+def invalidate_deleted_taxonomy_title_versions(sender, instance, **kwargs):
+    # The m2m rows go with the instance without m2m_changed; collect the titles first.
+    titles = taxonomy_titles(instance)
+    transaction.on_commit(lambda: invalidate_titles(titles))
+
+
+@receiver(post_save, sender=SiteSetting)
+@receiver(post_delete, sender=SiteSetting)
+def invalidate_cached_site_setting(sender, **kwargs):
+    transaction.on_commit(invalidate_site_setting)
+
+
+# Weekly schedule (movie.schedule)
+
+@receiver(post_save, sender=WeeklySchedule)
+@receiver(post_delete, sender=WeeklySchedule)
+@receiver(post_save, sender=Series)
+@receiver(post_delete, sender=Series)
+def invalidate_cached_weekly_schedule(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(invalidate_weekly_schedule)
+
+
+# Id pools of the random rails (movie.sampling)
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(post_save, sender=Series)
+@receiver(post_delete, sender=Series)
+@receiver(post_delete, sender=Country)
+@receiver(m2m_changed, sender=Movie.countries.through)
+@receiver(m2m_changed, sender=Series.countries.through)
+def invalidate_sampling_pools(sender, raw=False, **kwargs):
+    if raw or kwargs.get('action', '').startswith('pre_'):
+        return
+    transaction.on_commit(invalidate_pools)
+
+
+# Movie.best_download / Series.best_download
+
+@receiver(pre_save, sender=DownloadFile)
+def remember_download_owner(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._previous_owner = DownloadFile.objects.filter(
+            pk=instance.pk).values_list('movie_id', 'episode_id').first()
+
+
+@receiver(pre_delete, sender=DownloadFile)
+def remember_download_series(sender, instance, **kwargs):
+    # A cascading season/episode delete may remove the episode first.
+    if instance.episode_id:
+        instance._series_id = Series.objects.filter(
+            seasons__episodes=instance.episode_id).values_list('pk', flat=True).first()
+
+
+@receiver(post_save, sender=DownloadFile)
+@receiver(post_delete, sender=DownloadFile)
+def refresh_best_download(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    owners = {(instance.movie_id, instance.episode_id),
+              getattr(instance, '_previous_owner', None) or (None, None)}
+    movie_ids = {movie_id for movie_id, _ in owners if movie_id}
+    episode_ids = {episode_id for _, episode_id in owners if episode_id}
+    if movie_ids:
+        Movie.objects.filter(pk__in=movie_ids).refresh_best_download()
+    if episode_ids:
+        Series.objects.filter(
+            Q(seasons__episodes__in=episode_ids) |
+            Q(pk=getattr(instance, '_series_id', None))
+        ).refresh_best_download()
+
+
+# Series.season_count / Series.episode_count
+
+@receiver(pre_save, sender=Season)
+def remember_season_series(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._previous_series_id = Season.objects.filter(
+            pk=instance.pk).values_list('series_id', flat=True).first()
+
+
+@receiver(post_save, sender=Season)
+def count_saved_season(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        Series.objects.filter(pk=instance.series_id).shift_counts(seasons=1)
+        return
+    previous_series_id = getattr(instance, '_previous_series_id', None)
+    if previous_series_id != instance.series_id:
+        Series.objects.filter(
+            pk__in=[previous_series_id, instance.series_id]).refresh_counts()
+
+
+@receiver(post_delete, sender=Season)
+def count_deleted_season(sender, instance, **kwargs):
+    # The season's episodes are cascaded first and decrement themselves.
+    Series.objects.filter(pk=instance.series_id).shift_counts(seasons=-1)
+
+
+@receiver(pre_save, sender=Episode)
+def remember_episode_season(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._previous_season_id = Episode.objects.filter(
+            pk=instance.pk).values_list('season_id', flat=True).first()
+
+
+@receiver(post_save, sender=Episode)
+def count_saved_episode(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        Series.objects.filter(seasons=instance.season_id).shift_counts(episodes=1)
+        return
+    previous_season_id = getattr(instance, '_previous_season_id', None)
+    if previous_season_id != instance.season_id:
+        Series.objects.filter(
+            seasons__in=[previous_season_id, instance.season_id]).refresh_counts()
+
+
+@receiver(post_delete, sender=Episode)
+def count_deleted_episode(sender, instance, **kwargs):
+    Series.objects.filter(seasons=instance.season_id).shift_counts(episodes=-1)
+
+
+# Favorite snapshots (authentication.favorites)
+
+@receiver(pre_save, sender=Movie)
+@receiver(pre_save, sender=Series)
+def remember_favorite_snapshot(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._previous_snapshot = sender.objects.filter(
+            pk=instance.pk).values_list(*SNAPSHOT_SOURCE_FIELDS).first()
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Series)
+def refresh_favorite_snapshots(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_snapshot', None)
+    if raw or created or previous is None:
+        return
+    if previous == tuple(getattr(instance, field) for field in SNAPSHOT_SOURCE_FIELDS):
+        return
+    content_type = 'movie' if sender is Movie else 'series'
+    pk = instance.pk
+    transaction.on_commit(lambda: schedule_snapshot_refresh(content_type, pk))
+
+
+# UserWatchStats (movie.watch_stats); the buffered bulk upserts count themselves
+
+@receiver(pre_save, sender=WatchHistory)
+def remember_watch_country(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._previous_country = WatchHistory.objects.filter(
+            pk=instance.pk).values_list('country_id', 'country__name').first()
+
+
+def watch_country_name(instance):
+    return instance.country.name if instance.country_id is not None else ''
+
+
+@receiver(post_save, sender=WatchHistory)
+def count_saved_watch(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        record_changes([(instance.user_id, instance.content_type, watch_country_name(instance), 1)])
+        return
+    previous = getattr(instance, '_previous_country', None)
+    if previous is not None and previous[0] != instance.country_id:
+        record_changes([(instance.user_id, instance.content_type, previous[1] or '', -1),
+                        (instance.user_id, instance.content_type, watch_country_name(instance), 1)])
+
+
+@receiver(post_delete, sender=WatchHistory)
+def count_deleted_watch(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, get_user_model()):
+        # Deleted with the user, and so are the user's stats.
+        return
+    record_changes([(instance.user_id, instance.content_type, watch_country_name(instance), -1)])
@@ -0,0 +1,91 @@
+from celery import shared_task
+from django.apps import apps
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger('celery')
+
+
+def queue_once(key, task, args=(), countdown=0, timeout=10 * 60, stale_keys=()):
+    """
+    Queue ``task`` unless a run flagged by the cache key ``key`` is already
+    pending, so bursts of changes collapse into one run. The task deletes
+    ``key`` before it starts working, so changes made while it runs queue
+    another one. Returns whether the task was queued.
+    """
+    if not cache.add(key, True, timeout):
+        return False
+    return send_pending(key, task, args, countdown, stale_keys)
+
+
+def send_pending(key, task, args=(), countdown=0, stale_keys=()):
+    """
+    Queue ``task`` for a ``key`` the caller has already set. Without a
+    broker the flag is dropped, along with ``stale_keys``, so the next
+    change retries.
+    """
+    try:
+        task.apply_async(args, countdown=countdown)
+    except Exception:
+        logger.exception("Could not queue %s%r", task.name, tuple(args))
+        cache.delete_many([*stale_keys, key])
+        return False
+    return True
+
+
+@shared_task
+def rebuild_home_snapshot():
+    """
+    Rebuild the cached home page rails.
+    """
+    from .home import HOME_REBUILD_PENDING_KEY, build_home_snapshot
+
+    cache.delete(HOME_REBUILD_PENDING_KEY)
+    build_home_snapshot()
+    logger.info("Home page snapshot rebuilt")
+
+
+@shared_task
+def rebuild_related_titles(model_label):
+    """
+    Recompute the related titles index of every Movie or Series.
+    """
+    from .related import rebuild_related_index
+
+    count = rebuild_related_index(apps.get_model(model_label))
+    logger.info(f"Related index rebuilt for {count} {model_label} rows")
+
+
+@shared_task
+def patch_related_titles(model_label, pk):
+    """
+    Refresh the related titles index around one changed Movie or Series.
+    """
+    from .related import patch_pending_key, patch_related_index
+
+    cache.delete(patch_pending_key(model_label, pk))
+    count = patch_related_index(apps.get_model(model_label), pk)
+    logger.info(f"Related index patched around {model_label} {pk}: {count} rows")
+
+
+@shared_task
+def flush_watch_history():
+    """
+    Write the buffered watch events to WatchHistory.
+    """
+    from .watch_buffer import FLUSH_PENDING_KEY, flush_buffer
+
+    cache.delete(FLUSH_PENDING_KEY)
+    count = flush_buffer()
+    logger.info(f"Flushed {count} watch events")
+
+
+@shared_task
+def rebuild_watch_stats():
+    """
+    Recompute UserWatchStats of every user from WatchHistory.
+    """
+    from .watch_stats import rebuild_stats
+
+    count = len(rebuild_stats())
+    logger.info(f"Watch stats rebuilt for {count} users")
@@ -0,0 +1,237 @@
+"""
+In-process prefix index behind /main/suggest/.
+
+Every worker keeps a sorted list of ``(key, kind, pk)`` tuples where ``key``
+is a normalized movie/series title or crew name, or the tail of one
+starting at a later word. A lookup is a bisect to the first key >= prefix
+followed by a short scan. The index is built from the gunicorn
+post_worker_init hook (or on first use) and then kept current
+incrementally: change signals re-index the item in the worker that made
+the change and append ``(kind, pk, name)`` (name None for a removal) to a
+numbered change log in the shared cache, which the other workers replay
+on their next recheck. A worker that falls too far behind the log, or
+finds a gap in it, rebuilds in a background thread and keeps serving its
+current index until the new one is swapped in.
+"""
+import logging
+import sys
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .models import Crew, Movie, Series
+
+logger = logging.getLogger(__name__)
+
+# Number of the latest change; the change itself is under change_key(number)
+CHANGES_KEY = 'movie:typeahead:changes'
+
+MOVIE = 'movie'
+SERIES = 'series'
+CREW = 'crew'
+
+# Rough per-entry overhead on top of the key string: tuple, list slot, ints.
+ENTRY_OVERHEAD = 120
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+def change_key(number):
+    return f'movie:typeahead:change:{number}'
+
+
+def latest_change():
+    return cache.get(CHANGES_KEY, 0)
+
+
+def publish_change(kind, pk, name):
+    try:
+        number = cache.incr(CHANGES_KEY)
+    except ValueError:
+        cache.add(CHANGES_KEY, 0, None)
+        number = cache.incr(CHANGES_KEY)
+    cache.set(change_key(number), (kind, pk, name), settings.SUGGEST_INDEX_CHANGE_LOG_TIMEOUT)
+
+
+def keys_for(text):
+    """The full normalized text first, then its tails starting at each later word."""
+    text = normalize(text)
+    if not text:
+        return []
+    words = text.split(' ')
+    return [text] + [' '.join(words[i:]) for i in range(1, len(words))]
+
+
+class TypeaheadIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []
+        self.names = {}
+        self.keys = {}
+        self.size = 0
+        # Number of the last change log entry reflected in the index
+        self.applied = 0
+        # A missing log entry seen on the previous recheck
+        self.gap = None
+        self.rebuilding = False
+        self.checked_at = None
+
+    def _sources(self):
+        yield from ((MOVIE, pk, title) for pk, title in
+                    Movie.objects.order_by('-rate').values_list('pk', 'title').iterator())
+        yield from ((SERIES, pk, title) for pk, title in
+                    Series.objects.order_by('-rate').values_list('pk', 'title').iterator())
+        yield from ((CREW, pk, name) for pk, name in
+                    Crew.objects.values_list('pk', 'name').iterator())
+
+    def build(self):
+        """
+        Load every title and crew name. Full names are indexed first and
+        word tails after, until SUGGEST_INDEX_MEMORY_BUDGET bytes are used.
+        """
+        # Read first: changes logged while loading are replayed afterwards.
+        applied = latest_change()
+        budget = settings.SUGGEST_INDEX_MEMORY_BUDGET
+        items = list(self._sources())
+        names = {(kind, pk): name for kind, pk, name in items}
+        item_keys = {(kind, pk): keys_for(name) for kind, pk, name in items}
+
+        max_depth = max((len(candidates) for candidates in item_keys.values()), default=0)
+        ordered = (
+            (item, candidates[depth])
+            for depth in range(max_depth)
+            for item, candidates in item_keys.items() if depth < len(candidates)
+        )
+        entries, keys, size = [], {}, 0
+        for item, key in ordered:
+            cost = sys.getsizeof(key) + ENTRY_OVERHEAD
+            if size + cost > budget:
+                break
+            entries.append((key,) + item)
+            keys.setdefault(item, []).append(key)
+            size += cost
+        entries.sort()
+
+        with self.lock:
+            self.entries, self.names, self.keys, self.size = entries, names, keys, size
+            self.applied, self.gap = applied, None
+            self.checked_at = monotonic()
+
+    def rebuild_in_background(self):
+        """Build a new index in a thread; the current one is served until it is ready."""
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+
+        def run():
+            try:
+                self.build()
+            except Exception:
+                logger.exception("Could not rebuild the typeahead index")
+            finally:
+                self.rebuilding = False
+                connections.close_all()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _refresh_if_stale(self):
+        if self.checked_at is None:
+            # Nothing to serve yet; post_worker_init normally got here first.
+            self.build()
+            return
+        idle = monotonic() - self.checked_at
+        if idle < settings.SUGGEST_INDEX_RECHECK_INTERVAL:
+            return
+        self.checked_at = monotonic()
+        latest = latest_change()
+        if latest == self.applied:
+            return
+        # Entries expire after SUGGEST_INDEX_CHANGE_LOG_TIMEOUT, and the
+        # counter restarts if the cache loses it.
+        if latest < self.applied or latest - self.applied > settings.SUGGEST_INDEX_MAX_CHANGES or \
+                idle >= settings.SUGGEST_INDEX_CHANGE_LOG_TIMEOUT:
+            self.rebuild_in_background()
+            return
+
+        numbers = range(self.applied + 1, latest + 1)
+        changes = cache.get_many([change_key(number) for number in numbers])
+        with self.lock:
+            gap = None
+            for number in numbers:
+                if number <= self.applied:
+                    continue
+                change = changes.get(change_key(number))
+                if change is None:
+                    gap = number
+                    break
+                self._apply(*change)
+                self.applied = number
+            # Numbered but not written yet, or lost: wait one recheck.
+            lost, self.gap = gap is not None and gap == self.gap, gap
+        if lost:
+            self.rebuild_in_background()
+
+    def suggest(self, query, limit=8):
+        self._refresh_if_stale()
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        entries, names = self.entries, self.names
+
+        results, seen = [], set()
+        position = bisect_left(entries, (prefix,))
+        while position < len(entries) and len(results) < limit:
+            key, kind, pk = entries[position]
+            if not key.startswith(prefix):
+                break
+            if (kind, pk) not in seen:
+                seen.add((kind, pk))
+                results.append({'type': kind, 'id': pk, 'name': names[(kind, pk)]})
+            position += 1
+        return results
+
+    def _discard(self, item):
+        for key in self.keys.pop(item, ()):
+            position = bisect_left(self.entries, (key,) + item)
+            if position < len(self.entries) and self.entries[position] == (key,) + item:
+                del self.entries[position]
+                self.size -= sys.getsizeof(key) + ENTRY_OVERHEAD
+        self.names.pop(item, None)
+
+    def _apply(self, kind, pk, name):
+        """Re-index one item, or drop it when ``name`` is None."""
+        item = (kind, pk)
+        self._discard(item)
+        if name is None:
+            return
+        self.names[item] = name
+        for key in keys_for(name):
+            cost = sys.getsizeof(key) + ENTRY_OVERHEAD
+            if self.keys.get(item) and self.size + cost > settings.SUGGEST_INDEX_MEMORY_BUDGET:
+                break
+            insort(self.entries, (key,) + item)
+            self.keys.setdefault(item, []).append(key)
+            self.size += cost
+
+    def update(self, kind, pk, name):
+        """Re-index one item here and log the change for the other workers."""
+        if self.checked_at is not None:
+            with self.lock:
+                self._apply(kind, pk, name)
+        publish_change(kind, pk, name)
+
+    def remove(self, kind, pk):
+        self.update(kind, pk, None)
+
+
+index = TypeaheadIndex()
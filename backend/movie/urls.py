@@ -14,7 +14,9 @@ router.register('home', MoreMovieViewSet, basename='home_movies')
 
 urlpatterns = [
     path('search/', SearchView.as_view(), name='search'),
+    path('suggest/', SuggestView.as_view(), name='suggest'),
     path('weeklist/', WeeklyScheduleListView.as_view(), name='weekly-schedule-list'),
+    path('weeklist/airing/', WeeklyScheduleAiringView.as_view(), name='weekly-schedule-airing'),
     path('shortdescription/<int:id>/', ShortDescriptionView.as_view(), name='short-description'),
     path('home/', HomePageView.as_view(), name='home'),
     path('watch-history/', WatchHistoryView.as_view(), name='watch-history'),
@@ -1,23 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import F, Max, Subquery, OuterRef, Q
-from random import sample
+from time import monotonic
+from uuid import uuid4
 
 from .models import *
+from .sampling import sample_ids
 
 
 def get_movies_and_series_by_country(country_name, max_results=4):
+    """Up to ``max_results`` random chosen movies and series of a country."""
     movies = Movie.objects.filter(
-        Q(countries__name=country_name) & Q(choosen_country=True)
+        Q(countries__name=country_name) & Q(choosen_home_page=True)
     )
     series = Series.objects.filter(
-        Q(countries__name=country_name) & Q(choosen_country=True)
+        Q(countries__name=country_name) & Q(choosen_home_page=True)
     )
 
-    random_movies = sample(list(movies), min(len(movies), max_results))
-    random_series = sample(list(series), min(len(series), max_results))
+    movie_ids = sample_ids(f'country:movie:{country_name}', movies, max_results)
+    series_ids = sample_ids(f'country:series:{country_name}', series, max_results)
+    movies, series = Movie.objects.in_bulk(movie_ids), Series.objects.in_bulk(series_ids)
+    random_movies = [movies[pk] for pk in movie_ids if pk in movies]
+    random_series = [series[pk] for pk in series_ids if pk in series]
 
     return [random_movies, random_series]
 
 
+SITE_SETTING_VERSION_KEY = 'movie:site-setting:version'
+
+# Per-process copy of the site setting, revalidated against the shared
+# version key at most every SITE_SETTING_RECHECK_INTERVAL seconds.
+_site_setting = {'version': None, 'checked_at': None, 'download_domain': None}
+
+
+def invalidate_site_setting():
+    """Make every worker reload the site setting on its next recheck."""
+    cache.set(SITE_SETTING_VERSION_KEY, uuid4().hex, None)
+    _site_setting['checked_at'] = None
+
+
 def get_download_domain():
-    settings = SiteSetting.objects.first()
-    return settings.download_domain if settings else 'https://api.dramoir.com'
+    checked_at = _site_setting['checked_at']
+    if checked_at is None or \
+            monotonic() - checked_at >= settings.SITE_SETTING_RECHECK_INTERVAL:
+        version = cache.get_or_set(SITE_SETTING_VERSION_KEY, uuid4().hex, None)
+        if version != _site_setting['version']:
+            site_setting = SiteSetting.objects.first()
+            _site_setting['download_domain'] = site_setting.download_domain \
+                if site_setting else 'https://api.dramoir.com'
+            _site_setting['version'] = version
+        _site_setting['checked_at'] = monotonic()
+    return _site_setting['download_domain']
@@ -1,91 +1,159 @@
+from django.conf import settings
 from django.http import HttpResponseRedirect
-from django.db.models import F, Max, Subquery, OuterRef, Q, Count
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.db.models import F, Max, Q
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.viewsets import GenericViewSet, ViewSet
 from rest_framework.mixins import RetrieveModelMixin, ListModelMixin
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from itsdangerous import BadSignature, SignatureExpired  # type: ignore
 from django.utils.timezone import now
 from datetime import timedelta
-from random import sample
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 
 from rest_framework import generics
-from .models import Country, DownloadFile, Genre, Language, Movie, Series, WeeklySchedule, ShortDescription, WatchHistory
-from .serializers import CountrySerializer, GenreSerializer, LanguageSerializer, MovieDetailSerializer, MovieListSerializer, SeriesDetailSerializer, SeriesListSerializer, WeeklyScheduleSerializer, ShortDescriptionSerializer, WatchHistorySerializer, WatchHistoryCreateSerializer, WatchHistoryStatsSerializer
+from .models import Country, Genre, Language, Movie, Series, WeeklySchedule, ShortDescription, WatchHistory
+from .serializers import CountrySerializer, GenreSerializer, LanguageSerializer, MovieDetailSerializer, MovieListSerializer, SeriesDetailSerializer, SeriesListSerializer, SeriesSummarySerializer, WeeklyScheduleSerializer, ShortDescriptionSerializer, WatchHistorySerializer, WatchHistoryCreateSerializer, WatchHistoryStatsSerializer, requested_fields
 from .utilities import get_movies_and_series_by_country
+from .conditional import catalog_etag, conditional, movie_etag, series_etag, weekly_schedule_etag
+from .home import get_home_snapshot, render_home_page
+from .pagination import KeysetPagination, NewestFirstPagination, TitleCursorPagination, WatchHistoryPagination
+from .prefetch import movies_for_detail, movies_for_list, series_for_detail, series_for_list, series_for_summary
+from .schedule import airing, get_week
+from .sampling import in_pool
+from .search import SearchResults
+from .series_detail import season_data
+from .typeahead import index as typeahead_index
+from .watch_buffer import record_watch
+from .watch_stats import get_stats
 
 
 class HomePageView(APIView):
+    # The random rails differ per request (movie.home.RANDOM_RAILS): no
+    # ETag, and no copy in shared caches. The fixed rails come from the
+    # cached snapshot, so a request stays cheap.
+    @method_decorator(cache_control(private=True, no_cache=True))
     def get(self, request):
-        trend_movies = Movie.objects.filter(trend=True)
-        trend_series = Series.objects.filter(trend=True)
+        return Response(render_home_page(get_home_snapshot()))
 
-        choosen_korean_movie = Movie.objects.filter(
-            choosen_home_page=True, countries__name__in=["South Korea"])
-        choosen_movie = Movie.objects.filter(choosen_home_page=True).exclude(
-            countries__name__in=["South Korea"])
 
-        choosen_korean_series = Series.objects.filter(
-            choosen_home_page=True, countries__name__in=['South Korea'])
-        best_korean_series = Series.objects.filter(
-	    choosen_home_page=False,
-            countries__name__in=['South Korea']).order_by('-rate')[:6]
-        best_chineas_series = Series.objects.filter(
-            choosen_home_page=False,
-	    countries__name__in=['China']).order_by('-rate')[:6]
-        best_series = Series.objects.filter(choosen_home_page=False).exclude(
-	    countries__name__in=['South Korea', 'China']).order_by('-rate')[:6]
-
-        random_movies = sample(list(choosen_movie), min(len(choosen_movie), 8))
-        random_korean_movies = sample(
-            list(choosen_korean_movie), min(len(choosen_korean_movie), 8))
-        random_korean_series = sample(
-            list(choosen_korean_series), min(len(choosen_korean_series), 6))
-
-        return Response({
-            'trend_movies': MovieListSerializer(trend_movies, many=True).data,
-            'trend_series': SeriesListSerializer(trend_series, many=True).data,
-            'choosen_korean_movie': MovieListSerializer(random_korean_movies, many=True).data,
-            'choosen_movie': MovieListSerializer(random_movies, many=True).data,
-            'choosen_korean_series': SeriesListSerializer(random_korean_series, many=True).data,
-            'best_korean_series': SeriesListSerializer(best_korean_series, many=True).data,
-            'best_chineas_series': SeriesListSerializer(best_chineas_series, many=True).data,
-            'best_series': SeriesListSerializer(best_series, many=True).data
-        })
 class SearchView(APIView):
+    pagination_class = PageNumberPagination
+
     def get(self, request):
         query = request.query_params.get('q', '').strip()
         if not query:
             return Response({"results": []})
 
-        movies = Movie.objects.filter(title__icontains=query)
-
-        series = Series.objects.filter(title__icontains=query)
-
-        movie_serializer = MovieListSerializer(movies, many=True)
-        series_serializer = SeriesListSerializer(series, many=True)
+        paginator = self.pagination_class()
+        hits = paginator.paginate_queryset(SearchResults(query), request, view=self)
+
+        movies = movies_for_list(requested_fields(MovieListSerializer, request.query_params)).in_bulk(
+            [object_id for content_type, object_id in hits if content_type == 'movie'])
+        series = series_for_list(requested_fields(SeriesListSerializer, request.query_params)).in_bulk(
+            [object_id for content_type, object_id in hits if content_type == 'series'])
+        hits = [(content_type, object_id) for content_type, object_id in hits
+                if object_id in (movies if content_type == 'movie' else series)]
+
+        context = {'query_params': request.query_params}
+        movie_rows = MovieListSerializer(
+            [movies[object_id] for content_type, object_id in hits if content_type == 'movie'],
+            many=True, context=context).data
+        series_rows = SeriesListSerializer(
+            [series[object_id] for content_type, object_id in hits if content_type == 'series'],
+            many=True, context=context).data
+
+        rows = {('movie', row['id']): row for row in movie_rows}
+        rows.update({('series', row['id']): row for row in series_rows})
+        results = [{'content_type': content_type, **rows[(content_type, object_id)]}
+                   for content_type, object_id in hits]
+
+        response = paginator.get_paginated_response(results)
+        # Per type lists of the same page, kept for existing clients.
+        response.data['movies'] = movie_rows
+        response.data['series'] = series_rows
+        return response
+
+class SuggestView(APIView):
+    authentication_classes = []
+    permission_classes = []
 
-        results = {
-            "movies": movie_serializer.data,
-            "series": series_serializer.data
-        }
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 8)), 20)
+        except ValueError:
+            limit = 8
+        return Response({"results": typeahead_index.suggest(query, limit)})
+
+
+class SparseFieldsViewMixin:
+    """
+    ``?fields=``/``?expand=`` for views serializing titles: querysets only
+    load the relations the requested fields read (see SparseFieldsMixin).
+    """
+
+    def requested_fields(self, serializer_class=None):
+        return requested_fields(serializer_class or self.get_serializer_class(),
+                                self.request.query_params)
+
+    def sparse_context(self):
+        # Serializers built without the request keep relative image URLs.
+        return {'query_params': self.request.query_params}
+
+
+class BatchMixin:
+    """
+    ``batch/?ids=3,1,2`` on a title viewset: the list representation of up
+    to BATCH_MAX_IDS titles in request order, plus the ids that do not
+    exist. The ``batch`` action gets the list queryset and serializer, so
+    the cost is one query for the titles and the fragment cache misses.
+    """
+
+    def batch_ids(self):
+        ids = []
+        for value in self.request.query_params.get('ids', '').split(','):
+            value = value.strip()
+            if not value:
+                continue
+            if not value.isdigit():
+                raise ValidationError({'ids': f'"{value}" is not a valid id.'})
+            if int(value) not in ids:
+                ids.append(int(value))
+        if len(ids) > settings.BATCH_MAX_IDS:
+            raise ValidationError({'ids': f'At most {settings.BATCH_MAX_IDS} ids per request.'})
+        return ids
+
+    @action(detail=False, methods=['get'])
+    @conditional(catalog_etag, max_age=settings.CATALOG_MAX_AGE)
+    def batch(self, request):
+        ids = self.batch_ids()
+        titles = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer([titles[pk] for pk in ids if pk in titles], many=True)
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in titles],
+        })
 
-        return Response(results)
 
-class MoreSeriesViewSet(ListModelMixin, GenericViewSet):
-    queryset = Series.objects.all()
+class MoreSeriesViewSet(SparseFieldsViewMixin, ListModelMixin, GenericViewSet):
     serializer_class = SeriesListSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return series_for_list(self.requested_fields())
 
     @action(detail=False, methods=['get'], url_path='best_series', )
     def best(self, request):
         best_series = self.get_queryset().filter(choosen_home_page=False).exclude(
             countries__name__in=['South Korea', 'China']).order_by('-rate')
         page = self.paginate_queryset(best_series)
-        serializer = self.serializer_class(page, many=True)
+        serializer = self.serializer_class(page, many=True, context=self.sparse_context())
         return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='best_chineas_series')
@@ -94,7 +162,7 @@ class MoreSeriesViewSet(ListModelMixin, GenericViewSet):
 	    choosen_home_page=False,
             countries__name='China').order_by('-rate')
         page = self.paginate_queryset(best_chinese_series)
-        serializer = self.serializer_class(page, many=True)
+        serializer = self.serializer_class(page, many=True, context=self.sparse_context())
         return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='best_korean_series')
@@ -103,7 +171,7 @@ class MoreSeriesViewSet(ListModelMixin, GenericViewSet):
             choosen_home_page=False,
 	    countries__name='South Korea').order_by('-rate')
         page = self.paginate_queryset(best_korean_series)
-        serializer = self.serializer_class(page, many=True)
+        serializer = self.serializer_class(page, many=True, context=self.sparse_context())
         return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='choosen_korean_series')
@@ -111,20 +179,23 @@ class MoreSeriesViewSet(ListModelMixin, GenericViewSet):
         choosen_korean_series = self.get_queryset().filter(
             choosen_home_page=True, countries__name='South Korea')
         page = self.paginate_queryset(choosen_korean_series)
-        serializer = self.serializer_class(page, many=True)
+        serializer = self.serializer_class(page, many=True, context=self.sparse_context())
         return self.get_paginated_response(serializer.data)
 
 
-class MoreMovieViewSet(ListModelMixin, GenericViewSet):
-    queryset = Movie.objects.all()
+class MoreMovieViewSet(SparseFieldsViewMixin, ListModelMixin, GenericViewSet):
     serializer_class = MovieListSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return movies_for_list(self.requested_fields())
 
     @action(detail=False, methods=['get'], url_path='choosen_movies')
     def choosen(self, request):
         choosen_movie = self.get_queryset().filter(
             choosen_home_page=True).exclude(countries__name='South Korea')
         page = self.paginate_queryset(choosen_movie)
-        serializer = self.serializer_class(page, many=True)
+        serializer = self.serializer_class(page, many=True, context=self.sparse_context())
         return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='choosen_korean_movies')
@@ -132,110 +203,177 @@ class MoreMovieViewSet(ListModelMixin, GenericViewSet):
         choosen_korean_movie = self.get_queryset().filter(
             choosen_home_page=True, countries__name='South Korea')
         page = self.paginate_queryset(choosen_korean_movie)
-        serializer = self.serializer_class(page, many=True)
+        serializer = self.serializer_class(page, many=True, context=self.sparse_context())
         return self.get_paginated_response(serializer.data)
 
 
-class MovieViewSet(ListModelMixin,
+class MovieViewSet(SparseFieldsViewMixin,
+                   BatchMixin,
+                   ListModelMixin,
                    RetrieveModelMixin,
                    GenericViewSet):
-    queryset = Movie.objects.prefetch_related(
-        'countries', 'languages', 'genres', 'download_urls'
-    ).annotate(
-        highest_quality=Subquery(
-            DownloadFile.objects.filter(movie=OuterRef('pk'))
-            .order_by('source', '-quality')
-            .values('quality')[:1]
-        ),
-        highest_source=Subquery(
-            DownloadFile.objects.filter(movie=OuterRef('pk'))
-            .order_by('source', '-quality')
-            .values('source')[:1]
-        )
-    )
+    pagination_class = NewestFirstPagination
+
+    def get_queryset(self):
+        if self.action in ('list', 'batch'):
+            return movies_for_list(self.requested_fields())
+        return movies_for_detail(self.requested_fields())
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'batch'):
             return MovieListSerializer
         return MovieDetailSerializer
 
+    @conditional(catalog_etag, max_age=settings.CATALOG_MAX_AGE)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(movie_etag, max_age=settings.CATALOG_MAX_AGE)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
-class SeriesViewSet(ListModelMixin,
+
+class SeriesViewSet(SparseFieldsViewMixin,
+                    BatchMixin,
+                    ListModelMixin,
                     RetrieveModelMixin,
                     GenericViewSet):
 
+    """
+    ``?mode=summary`` on retrieve returns season headers only; the
+    episodes of one season come from ``seasons/<number>/``.
+    """
+    pagination_class = NewestFirstPagination
+
+    def is_summary(self):
+        return self.request.query_params.get('mode') == 'summary'
+
     def get_queryset(self):
-        if self.action == 'list':
-            return Series.objects.prefetch_related(
-                'countries', 'languages', 'genres').all()
-        return Series.objects.prefetch_related(
-            'countries', 'languages', 'genres',
-            'seasons', 'seasons__episodes',
-            'seasons__episodes__download_urls').all()
+        if self.action in ('list', 'batch'):
+            return series_for_list(self.requested_fields())
+        if self.is_summary():
+            return series_for_summary(self.requested_fields())
+        return series_for_detail(self.requested_fields())
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'batch'):
             return SeriesListSerializer
+        if self.is_summary():
+            return SeriesSummarySerializer
         return SeriesDetailSerializer
 
+    @conditional(catalog_etag, max_age=settings.CATALOG_MAX_AGE)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-class CountryViewSet(RetrieveModelMixin,
-                     GenericViewSet):
-    queryset = Country.objects.prefetch_related(
-        'series', 'movies').all()
-    serializer_class = CountrySerializer
+    @conditional(series_etag, max_age=settings.CATALOG_MAX_AGE)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=True, methods=['get'], url_path=r'seasons/(?P<number>[0-9]+)')
+    @conditional(series_etag, max_age=settings.CATALOG_MAX_AGE)
+    def season(self, request, pk=None, number=None):
+        data = season_data(pk, number)
+        if data is None:
+            raise NotFound()
+        return Response(data)
+
+
+class TaxonomyTitlesViewSet(SparseFieldsViewMixin,
+                            RetrieveModelMixin,
+                            GenericViewSet):
+    """
+    A country, genre or language with the first page of its movies and
+    series. The ``movies`` and ``series`` actions page through the rest;
+    all three accept ``?sort=rate|year|newest``.
+    """
+    pagination_class = TitleCursorPagination
     lookup_field = 'name'
+    # Name of the Movie/Series m2m field pointing at this taxonomy
+    titles_field = None
+
+    def sparse_context(self):
+        # Nested in the taxonomy serializer these rows always had absolute image URLs.
+        return {**super().sparse_context(), 'request': self.request}
+
+    def titles(self, taxonomy, action_name):
+        if action_name == 'movies':
+            serializer_class = MovieListSerializer
+            queryset = movies_for_list(self.requested_fields(serializer_class))
+        else:
+            serializer_class = SeriesListSerializer
+            queryset = series_for_list(self.requested_fields(serializer_class))
+        return queryset.filter(**{self.titles_field: taxonomy}), serializer_class
+
+    def retrieve(self, request, *args, **kwargs):
+        taxonomy = self.get_object()
+        data = dict(self.get_serializer(taxonomy).data)
+        for action_name in ('movies', 'series'):
+            queryset, serializer_class = self.titles(taxonomy, action_name)
+            paginator = self.pagination_class()
+            page = paginator.paginate_first_page(
+                queryset, request,
+                self.reverse_action(action_name, kwargs={'name': kwargs['name']}),
+                view=self)
+            data[action_name] = serializer_class(page, many=True, context=self.sparse_context()).data
+            data[f'{action_name}_next'] = paginator.get_next_link()
+        return Response(data)
+
+    def list_titles(self, action_name):
+        queryset, serializer_class = self.titles(self.get_object(), action_name)
+        page = self.paginate_queryset(queryset)
+        serializer = serializer_class(page, many=True, context=self.sparse_context())
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def movies(self, request, name=None):
+        return self.list_titles('movies')
 
+    @action(detail=True, methods=['get'])
+    def series(self, request, name=None):
+        return self.list_titles('series')
 
-class LanguageViewSet(RetrieveModelMixin,
-                      GenericViewSet):
-    queryset = Language.objects.prefetch_related(
-        'series', 'movies').all()
+
+class CountryViewSet(TaxonomyTitlesViewSet):
+    queryset = Country.objects.all()
+    serializer_class = CountrySerializer
+    titles_field = 'countries'
+
+
+class LanguageViewSet(TaxonomyTitlesViewSet):
+    queryset = Language.objects.all()
     serializer_class = LanguageSerializer
-    lookup_field = 'name'
+    titles_field = 'languages'
 
 
-class GenreViewSet(RetrieveModelMixin,
-                   GenericViewSet):
-    queryset = Genre.objects.prefetch_related(
-        'series', 'movies').all()
+class GenreViewSet(TaxonomyTitlesViewSet):
+    queryset = Genre.objects.all()
     serializer_class = GenreSerializer
-    lookup_field = 'name'
+    titles_field = 'genres'
 
 class WeeklyScheduleListView(generics.ListAPIView):
+    """
+    The active schedules grouped by weekday, or the list of one ``?day=``,
+    served from the cached week (movie.schedule).
+    """
     queryset = WeeklySchedule.objects.filter(is_active=True).select_related('series')
     serializer_class = WeeklyScheduleSerializer
     pagination_class = None
-    
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        day = self.request.query_params.get('day', None)
-        
-        if day:
-            queryset = queryset.filter(day_of_week=day)
-            
-        return queryset
-    
+
+    @conditional(weekly_schedule_etag, max_age=settings.WEEKLY_SCHEDULE_MAX_AGE)
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        
-        # Group by days if no specific day is requested
-        if not request.query_params.get('day'):
-            schedule_by_day = {}
-            for day, day_name in WeeklySchedule.DAY_CHOICES:
-                day_schedules = queryset.filter(day_of_week=day)
-                if day_schedules.exists():
-                    serializer = self.get_serializer(day_schedules, many=True)
-                    schedule_by_day[day] = {
-                        'day_name': day_name,
-                        'schedules': serializer.data
-                    }
-            
-            return Response(schedule_by_day)
-        
-        # Normal list response for specific day filter
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        week = get_week(request)
+        day = request.query_params.get('day', None)
+        if day:
+            return Response(week.get(day, {}).get('schedules', []))
+        return Response(week)
+
+
+class WeeklyScheduleAiringView(APIView):
+    """Today's schedules and the next one to air, in Tehran time."""
+
+    def get(self, request):
+        return Response(airing(get_week(request)))
 
 
 class ShortDescriptionView(generics.RetrieveAPIView):
@@ -254,9 +392,11 @@ class WatchHistoryView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        watch_history = WatchHistory.objects.filter(user=request.user)
-        serializer = WatchHistorySerializer(watch_history, many=True)
-        return Response(serializer.data)
+        watch_history = WatchHistory.objects.filter(user=request.user).select_related('country')
+        paginator = WatchHistoryPagination()
+        page = paginator.paginate_queryset(watch_history, request, view=self)
+        serializer = WatchHistorySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         content_type = request.data.get('content_type')
@@ -268,41 +408,33 @@ class WatchHistoryView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            if content_type == 'movie':
-                content = Movie.objects.get(id=content_id)
-                # Get the first country from the countries list
-                country = content.countries.first().name if content.countries.exists() else None
-            elif content_type == 'series':
-                content = Series.objects.get(id=content_id)
-                # Get the first country from the countries list
-                country = content.countries.first().name if content.countries.exists() else None
-            else:
-                return Response(
-                    {'error': 'Invalid content_type'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            watch_history, created = WatchHistory.objects.get_or_create(
-                user=request.user,
-                content_type=content_type,
-                content_id=content_id,
-                defaults={'country': country}
+        if content_type not in (WatchHistory.MOVIE, WatchHistory.SERIES):
+            return Response(
+                {'error': 'Invalid content_type'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not str(content_id).isdigit():
+            return Response(
+                {'error': 'Invalid content_id'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-            if not created:
-                watch_history.country = country
-                watch_history.save()
-
-            serializer = WatchHistorySerializer(watch_history)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        except (Movie.DoesNotExist, Series.DoesNotExist):
+        # The id pool answers without a query; titles added since this worker's
+        # last pool recheck fall through to the database.
+        model = Movie if content_type == WatchHistory.MOVIE else Series
+        content_id = int(content_id)
+        if not in_pool(f'all:{content_type}', model.objects.all(), content_id) and \
+                not model.objects.filter(pk=content_id).exists():
             return Response(
                 {'error': f'{content_type} not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        # Written by the next flush (movie.watch_buffer); titles deleted by then are dropped there.
+        record_watch(request.user.pk, content_type, content_id)
+        return Response({'content_type': content_type, 'content_id': content_id},
+                        status=status.HTTP_202_ACCEPTED)
+
     def delete(self, request):
         """Remove a movie/series from watch history"""
         serializer = WatchHistoryCreateSerializer(data=request.data)
@@ -327,34 +459,5 @@ class WatchHistoryStatsView(APIView):
 
     def get(self, request):
         """Get user's watch history statistics"""
-        # Get total counts
-        total_movies = WatchHistory.objects.filter(
-            user=request.user,
-            content_type='movie'
-        ).count()
-        
-        total_series = WatchHistory.objects.filter(
-            user=request.user,
-            content_type='series'
-        ).count()
-
-        # Get counts by country
-        movies_by_country = dict(WatchHistory.objects.filter(
-            user=request.user,
-            content_type='movie'
-        ).values('country').annotate(count=Count('id')).values_list('country', 'count'))
-
-        series_by_country = dict(WatchHistory.objects.filter(
-            user=request.user,
-            content_type='series'
-        ).values('country').annotate(count=Count('id')).values_list('country', 'count'))
-
-        data = {
-            'total_movies': total_movies,
-            'total_series': total_series,
-            'movies_by_country': movies_by_country,
-            'series_by_country': series_by_country
-        }
-
-        serializer = WatchHistoryStatsSerializer(data)
+        serializer = WatchHistoryStatsSerializer(get_stats(request.user))
         return Response(serializer.data)
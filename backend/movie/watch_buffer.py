@@ -0,0 +1,237 @@
+"""
+Write-behind ingestion of watch history.
+
+A play event is one RPUSH of ``[user_id, content_type, content_id,
+timestamp]`` onto a Redis list, pipelined with the flag that queues
+flush_watch_history (tasks.flush_watch_history) at most once per
+WATCH_HISTORY_FLUSH_DELAY. The flush pops the buffer in batches, resolves
+the first country of every title in one query per content type, drops
+events for titles that no longer exist and upserts the rest with one
+bulk_create on the (user, content_id, content_type) key, updating
+UserWatchStats with it. Rows are stamped with the time of their latest
+event, so watched_at is the last time the title was played and
+archive_watch_history never archives a title that is still being watched.
+
+When the cache is not Redis, or Redis fails, events go to a per-process
+buffer that is flushed inline once it holds WATCH_HISTORY_LOCAL_BUFFER_SIZE
+events, by a timer WATCH_HISTORY_FLUSH_DELAY seconds after its first event,
+and at interpreter exit.
+"""
+import atexit
+import json
+import logging
+import threading
+from datetime import datetime, timezone as dt_timezone
+from time import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import connections, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Country, Movie, Series, WatchHistory
+from .watch_stats import record_changes
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = 'movie:watch-history:buffer'
+FLUSH_PENDING_KEY = 'movie:watch-history:flush-pending'
+
+_local = {'events': [], 'timer': None, 'lock': threading.Lock()}
+# redis-py clients by URL; each holds its own connection pool
+_clients = {}
+
+
+def redis_client():
+    """
+    A redis-py client for the server the default cache writes to (the first
+    of its LOCATION), or None for other backends.
+    """
+    if not isinstance(caches['default'], RedisCache):
+        return None
+    location = settings.CACHES['default']['LOCATION']
+    if isinstance(location, str):
+        location = location.split(',')
+    url = location[0].strip()
+    if url not in _clients:
+        import redis
+
+        _clients[url] = redis.Redis.from_url(url)
+    return _clients[url]
+
+
+def record_watch(user_id, content_type, content_id):
+    """Buffer one play event; the row is written by the next flush."""
+    event = json.dumps([user_id, content_type, content_id, time()])
+    client = redis_client()
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.rpush(cache.make_key(BUFFER_KEY), event)
+            pipe.set(cache.make_key(FLUSH_PENDING_KEY), 1,
+                     nx=True, ex=settings.WATCH_HISTORY_FLUSH_DELAY * 10)
+            _, queue_flush = pipe.execute()
+        except Exception:
+            logger.exception("Could not buffer watch event in Redis")
+        else:
+            if queue_flush:
+                schedule_flush()
+            return
+    record_watch_locally(event)
+
+
+def schedule_flush():
+    from .tasks import flush_watch_history, send_pending
+
+    # The flag was set with the RPUSH; without a broker the events stay
+    # buffered and the next event retries.
+    send_pending(FLUSH_PENDING_KEY, flush_watch_history,
+                 countdown=settings.WATCH_HISTORY_FLUSH_DELAY)
+
+
+def record_watch_locally(event):
+    with _local['lock']:
+        _local['events'].append(event)
+        if len(_local['events']) < settings.WATCH_HISTORY_LOCAL_BUFFER_SIZE:
+            if _local['timer'] is None:
+                # Idle workers still flush: nothing else may come to trigger it.
+                _local['timer'] = threading.Timer(settings.WATCH_HISTORY_FLUSH_DELAY, flush_local)
+                _local['timer'].daemon = True
+                _local['timer'].start()
+            return
+    write_events(take_local_events())
+
+
+def take_local_events():
+    with _local['lock']:
+        events, _local['events'] = _local['events'], []
+        if _local['timer'] is not None:
+            _local['timer'].cancel()
+            _local['timer'] = None
+    return events
+
+
+@atexit.register
+def flush_local():
+    try:
+        write_events(take_local_events())
+    except Exception:
+        logger.exception("Could not flush the local watch event buffer")
+    finally:
+        # Called from the timer thread, which owns its connections.
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+
+
+def pop_events(client, count):
+    pipe = client.pipeline(transaction=True)
+    pipe.lrange(cache.make_key(BUFFER_KEY), 0, count - 1)
+    pipe.ltrim(cache.make_key(BUFFER_KEY), count, -1)
+    events, _ = pipe.execute()
+    return events
+
+
+def flush_buffer():
+    """Write every buffered event; returns the number of events read."""
+    client = redis_client()
+    if client is None:
+        events = take_local_events()
+        write_events(events)
+        return len(events)
+
+    total = 0
+    while True:
+        events = pop_events(client, settings.WATCH_HISTORY_FLUSH_BATCH)
+        if not events:
+            return total
+        write_events(events)
+        total += len(events)
+
+
+def first_countries(model, ids):
+    """{title id: id of its first country, or None} for the ``ids`` that exist."""
+    if not ids:
+        return {}
+    return dict(model.objects.filter(pk__in=ids).annotate(first_country=Min('countries'))
+                .values_list('pk', 'first_country'))
+
+
+def write_events(events):
+    """Upsert the WatchHistory rows of raw buffered events; returns the rows written."""
+    # (user_id, content_type, content_id) -> latest watched_at, in order of first event
+    watched = {}
+    now = timezone.now()
+    for event in events:
+        try:
+            # Events buffered before the timestamp was added have three items.
+            user_id, content_type, content_id, *stamp = json.loads(event)
+            watched_at = datetime.fromtimestamp(stamp[0], dt_timezone.utc) if stamp else now
+        except (TypeError, ValueError, OverflowError, OSError):
+            logger.warning("Dropping malformed watch event %r", event)
+            continue
+        key = (user_id, content_type, content_id)
+        if key not in watched or watched_at > watched[key]:
+            watched[key] = watched_at
+    if not watched:
+        return 0
+
+    countries = {
+        content_type: first_countries(model, {content_id for _, kind, content_id in watched
+                                              if kind == content_type})
+        for content_type, model in ((WatchHistory.MOVIE, Movie), (WatchHistory.SERIES, Series))
+    }
+
+    with transaction.atomic():
+        # Locking the users makes concurrent flushes (the Redis flush task and
+        # a local buffer flush) for the same users run one after the other, so
+        # each reads the rows the other wrote and UserWatchStats counts every
+        # change once.
+        user_ids = set(get_user_model().objects.select_for_update().filter(
+            pk__in={user_id for user_id, _, _ in watched}).order_by('pk').values_list('pk', flat=True))
+        rows = [
+            WatchHistory(user_id=user_id, content_type=content_type, content_id=content_id,
+                         country_id=countries[content_type][content_id], watched_at=watched_at)
+            for (user_id, content_type, content_id), watched_at in watched.items()
+            if user_id in user_ids and content_id in countries.get(content_type, {})
+        ]
+        if not rows:
+            return 0
+
+        # bulk_create sends no signals; count new rows and country moves here.
+        history = WatchHistory.objects.filter(
+            user_id__in={row.user_id for row in rows},
+            content_id__in={row.content_id for row in rows},
+        ).values_list('user_id', 'content_type', 'content_id', 'country_id', 'watched_at')
+        existing = {(user_id, content_type, content_id): (country, watched_at)
+                    for user_id, content_type, content_id, country, watched_at in history}
+        # (row, previous country id or None, whether the row is new)
+        moved = []
+        for row in rows:
+            key = (row.user_id, row.content_type, row.content_id)
+            if key not in existing:
+                moved.append((row, None, True))
+                continue
+            previous, last_watched = existing[key]
+            # A late flush of older events never moves watched_at back.
+            row.watched_at = max(row.watched_at, last_watched)
+            if previous != row.country_id:
+                moved.append((row, previous, False))
+        # UserWatchStats counts by country name.
+        country_ids = {country_id for row, previous, _ in moved
+                       for country_id in (row.country_id, previous)} - {None}
+        names = dict(Country.objects.filter(pk__in=country_ids).values_list('pk', 'name')) \
+            if country_ids else {}
+        changes = []
+        for row, previous, new in moved:
+            if not new:
+                changes.append((row.user_id, row.content_type, names.get(previous, ''), -1))
+            changes.append((row.user_id, row.content_type, names.get(row.country_id, ''), 1))
+
+        WatchHistory.objects.bulk_create(
+            rows, update_conflicts=True,
+            unique_fields=['user', 'content_id', 'content_type'], update_fields=['country', 'watched_at'])
+        record_changes(changes)
+    return len(rows)
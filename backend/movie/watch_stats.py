@@ -0,0 +1,76 @@
+"""
+UserWatchStats maintenance.
+
+Single WatchHistory saves and deletes are counted by movie.signals, the
+buffered upserts by movie.watch_buffer; both hand record_changes() a list
+of (user_id, content_type, country name, delta), '' standing for no
+country. A user without a stats row
+gets one built from their history instead, so the materialization heals
+itself; rebuild_stats() recomputes any set of users with one GROUP BY.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+from django.utils import timezone
+
+from .models import UserWatchStats, WatchHistory
+
+STATS_FIELDS = ['total_movies', 'total_series', 'movies_by_country', 'series_by_country',
+                'updated_at']
+
+
+def record_changes(changes):
+    """Apply (user_id, content_type, country name, delta) changes to the users' stats."""
+    changes_by_user = defaultdict(list)
+    for user_id, content_type, country, delta in changes:
+        changes_by_user[user_id].append((content_type, country, delta))
+    if not changes_by_user:
+        return
+
+    with transaction.atomic():
+        stats = UserWatchStats.objects.select_for_update().in_bulk(list(changes_by_user))
+        for user_id, user_stats in stats.items():
+            for content_type, country, delta in changes_by_user[user_id]:
+                user_stats.add(content_type, country, delta)
+            user_stats.updated_at = timezone.now()
+        UserWatchStats.objects.bulk_update(stats.values(), STATS_FIELDS)
+        missing = set(changes_by_user) - set(stats)
+        if missing:
+            rebuild_stats(missing)
+
+
+def rebuild_stats(user_ids=None):
+    """
+    Recompute the stats of ``user_ids`` (every user with history when
+    None) from WatchHistory. Returns {user_id: UserWatchStats}.
+    """
+    history = WatchHistory.objects.all()
+    if user_ids is not None:
+        history = history.filter(user_id__in=user_ids)
+    counts = history.order_by().values_list('user_id', 'content_type', 'country__name') \
+        .annotate(count=Count('pk'))
+
+    stats = {}
+    for user_id, content_type, country, count in counts.iterator():
+        user_stats = stats.setdefault(user_id, UserWatchStats(user_id=user_id))
+        user_stats.add(content_type, country or '', count)
+
+    with transaction.atomic():
+        UserWatchStats.objects.bulk_create(
+            stats.values(), batch_size=1000, update_conflicts=True,
+            unique_fields=['user'], update_fields=STATS_FIELDS)
+        # Users whose history is gone
+        stale = UserWatchStats.objects.filter(
+            ~Exists(WatchHistory.objects.filter(user=OuterRef('user'))))
+        if user_ids is not None:
+            stale = stale.filter(user_id__in=user_ids)
+        stale.delete()
+    return stats
+
+
+def get_stats(user):
+    stats = UserWatchStats.objects.filter(pk=user.pk).first()
+    if stats is None:
+        stats = rebuild_stats([user.pk]).get(user.pk) or UserWatchStats(user=user)
+    return stats
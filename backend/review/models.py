@@ -3,6 +3,31 @@ from django.db import models
 from movie.models import Movie, Series
 
 
+class CommentQuerySet(models.QuerySet):
+    """
+    update() skips model signals, so recompute the rating aggregates of
+    the affected titles after it (e.g. the accept/reject admin actions).
+    """
+    tracked_fields = ('accepted', 'rating', 'movie', 'movie_id', 'series', 'series_id')
+
+    def _targets(self, pks):
+        rows = self.model._base_manager.filter(
+            pk__in=pks).values_list('movie_id', 'series_id')
+        return ({movie_id for movie_id, _ in rows if movie_id},
+                {series_id for _, series_id in rows if series_id})
+
+    def update(self, **kwargs):
+        if not set(kwargs) & set(self.tracked_fields):
+            return super().update(**kwargs)
+        pks = list(self.values_list('pk', flat=True))
+        movie_ids, series_ids = self._targets(pks)
+        rows = super().update(**kwargs)
+        new_movie_ids, new_series_ids = self._targets(pks)
+        Movie.objects.filter(pk__in=movie_ids | new_movie_ids).refresh_ratings()
+        Series.objects.filter(pk__in=series_ids | new_series_ids).refresh_ratings()
+        return rows
+
+
 class Comment(models.Model):
     movie = models.ForeignKey(
         Movie,
@@ -36,6 +61,8 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
     def __str__(self):
         return f"Comment on {self.movie.title}" if self.movie else f"Comment by on {self.series}"
 
@@ -0,0 +1,54 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from movie.models import Movie, Series
+
+from .models import Comment
+
+
+def _contribution(movie_id, series_id, accepted, rating):
+    """The share a comment adds to its title's rating aggregates."""
+    if not accepted:
+        return None
+    if movie_id:
+        target = Movie.objects.filter(pk=movie_id)
+    else:
+        target = Series.objects.filter(pk=series_id)
+    return target, rating or 0, int(rating is not None)
+
+
+def _shift(contribution, sign):
+    if contribution is None:
+        return
+    target, rating, ratings = contribution
+    target.shift_ratings(rating=sign * rating, ratings=sign * ratings, comments=sign)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_state(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._previous_state = Comment.objects.filter(pk=instance.pk).values_list(
+        'movie_id', 'series_id', 'accepted', 'rating').first()
+
+
+@receiver(post_save, sender=Comment)
+def update_ratings_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.movie_id, instance.series_id, instance.accepted, instance.rating)
+    previous = None if created else getattr(instance, '_previous_state', None)
+    if previous == current:
+        return
+    if previous is not None:
+        _shift(_contribution(*previous), -1)
+    _shift(_contribution(*current), 1)
+
+
+@receiver(post_delete, sender=Comment)
+def update_ratings_on_delete(sender, instance, **kwargs):
+    # The deleted instance may be stale, so recount instead of shifting.
+    if instance.movie_id:
+        Movie.objects.filter(pk=instance.movie_id).refresh_ratings()
+    if instance.series_id:
+        Series.objects.filter(pk=instance.series_id).refresh_ratings()